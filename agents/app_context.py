@@ -0,0 +1,117 @@
+from tools.rag_retriever import JobRetriever, CHROMA_DIR
+from tools.llm_gateway import gateway
+from agents.response_cache import ResponseCache
+import os
+import threading
+import time
+
+NOT_STARTED = "not_started"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class AppContext:
+    """Owns the process-wide retriever, response cache and compiled agent.
+
+    Nothing is built at import time: each resource is created on first use,
+    or all at once by warm_up(). The state ("not_started", "loading",
+    "ready" or "failed") is what /health reports.
+    """
+
+    def __init__(self):
+        self.state = NOT_STARTED
+        self.error = None
+        self.load_seconds = None
+        self._lock = threading.RLock()
+        self._retriever = None
+        self._response_cache = None
+        self._agent = None
+
+    @property
+    def retriever(self) -> JobRetriever:
+        if self._retriever is None:
+            with self._lock:
+                if self._retriever is None:
+                    self._retriever = JobRetriever()
+        else:
+            # Picks up syncs and rebuilds run by other processes.
+            self._retriever.refresh()
+        return self._retriever
+
+    @property
+    def response_cache(self) -> ResponseCache:
+        if self._response_cache is None:
+            with self._lock:
+                if self._response_cache is None:
+                    self._response_cache = ResponseCache(
+                        embeddings=self.retriever.embedding_model,
+                        similarity_threshold=float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0")) or None
+                    )
+        return self._response_cache
+
+    @property
+    def agent(self):
+        if self._agent is None:
+            self.warm_up()
+            if self._agent is None:
+                raise RuntimeError(f"Agent failed to load: {self.error}")
+        return self._agent
+
+    @property
+    def ready(self) -> bool:
+        return self.state == READY
+
+    def warm_up(self, background: bool = False):
+        """Build the retriever, response cache and agent. Safe to call more than once."""
+        if background:
+            thread = threading.Thread(target=self.warm_up, name="warm-up", daemon=True)
+            thread.start()
+            return thread
+
+        with self._lock:
+            if self._agent is not None:
+                return self._agent
+            from agents.langgraph_agent import get_agent
+
+            self.state, self.error = LOADING, None
+            started = time.monotonic()
+            try:
+                self.retriever
+                self.response_cache
+                self._agent = get_agent()
+            except Exception as e:
+                self.state, self.error = FAILED, str(e)
+                print(f"Application context failed to load: {e}")
+                return None
+            self.load_seconds = round(time.monotonic() - started, 3)
+            self.state = READY
+            print(f"Application context ready in {self.load_seconds}s")
+            return self._agent
+
+    def reopen_after_fork(self):
+        """Replace connections inherited from a preloading parent process.
+
+        The loaded catalog, BM25 and location indexes stay shared through
+        copy-on-write; the Chroma client, the embedding cache's SQLite
+        connection and the Gemini clients are recreated in the worker.
+        """
+        gateway.reset_clients()
+        if self._retriever is None:
+            return
+        from chromadb.api.client import SharedSystemClient
+
+        SharedSystemClient.clear_system_cache()
+        self._retriever.db = self._retriever._open_db(CHROMA_DIR)
+        self._retriever.embedding_model.reopen()
+
+    def status(self) -> dict:
+        status = {"state": self.state, "ready": self.ready}
+        if self.load_seconds is not None:
+            status["load_seconds"] = self.load_seconds
+        if self.error:
+            status["error"] = self.error
+        return status
+
+
+app_context = AppContext()
@@ -0,0 +1,445 @@
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    CheckpointTuple,
+    WRITES_IDX_MAP,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+from collections import OrderedDict
+from contextlib import contextmanager
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+COMPRESS_MIN_BYTES = 1024
+PURGE_INTERVAL_SECONDS = 60
+
+
+def trim_checkpoint_messages(checkpoint, max_messages: int):
+    """Return a copy of the checkpoint keeping at most the last max_messages messages.
+
+    The cut is moved forward to a user message so assistant tool calls are never
+    separated from their tool results.
+    """
+    messages = checkpoint.get("channel_values", {}).get("messages")
+    if not max_messages or not messages or len(messages) <= max_messages:
+        return checkpoint
+
+    def is_user(message):
+        return isinstance(message, dict) and message.get("role") == "user"
+
+    start = len(messages) - max_messages
+    while start < len(messages) and not is_user(messages[start]):
+        start += 1
+    if start >= len(messages):
+        user_indices = [i for i, message in enumerate(messages) if is_user(message)]
+        start = user_indices[-1] if user_indices else 0
+
+    channel_values = dict(checkpoint["channel_values"])
+    channel_values["messages"] = messages[start:]
+    return {**checkpoint, "channel_values": channel_values}
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """In-memory checkpointer with bounded growth.
+
+    - Threads idle for longer than ttl_seconds are evicted.
+    - At most max_threads threads are kept, evicting the least recently used.
+    - Each thread stores at most max_messages messages.
+    - Only the latest keep_checkpoints checkpoints per thread are retained.
+    """
+
+    def __init__(self, max_threads: int = 1000, ttl_seconds: float = 3600,
+                 max_messages: int = 40, keep_checkpoints: int = 2):
+        super().__init__()
+        self.max_threads = max_threads
+        self.ttl_seconds = ttl_seconds
+        self.max_messages = max_messages
+        self.keep_checkpoints = keep_checkpoints
+        self.evictions = 0
+        self._last_access = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _touch(self, thread_id: str):
+        now = time.monotonic()
+        self._last_access[thread_id] = now
+        self._last_access.move_to_end(thread_id)
+
+        while self._last_access:
+            oldest, last_access = next(iter(self._last_access.items()))
+            expired = self.ttl_seconds and now - last_access > self.ttl_seconds
+            if not expired and len(self._last_access) <= self.max_threads:
+                break
+            self._last_access.popitem(last=False)
+            super().delete_thread(oldest)
+            self.evictions += 1
+
+    def _prune_checkpoints(self, thread_id: str, checkpoint_ns: str):
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        if len(checkpoints) <= self.keep_checkpoints:
+            return
+        kept = sorted(checkpoints, reverse=True)[:self.keep_checkpoints]
+        for checkpoint_id in [cid for cid in checkpoints if cid not in kept]:
+            del checkpoints[checkpoint_id]
+            self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+
+        referenced = set()
+        for checkpoint_id in kept:
+            checkpoint = self.serde.loads_typed(checkpoints[checkpoint_id][0])
+            referenced.update(checkpoint["channel_versions"].items())
+        for key in [
+            key for key in self.blobs
+            if key[0] == thread_id and key[1] == checkpoint_ns and (key[2], key[3]) not in referenced
+        ]:
+            del self.blobs[key]
+
+    def get_tuple(self, config):
+        with self._lock:
+            thread_id = config["configurable"]["thread_id"]
+            if thread_id in self._last_access:
+                self._touch(thread_id)
+            return super().get_tuple(config)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        with self._lock:
+            checkpoint = trim_checkpoint_messages(checkpoint, self.max_messages)
+            result = super().put(config, checkpoint, metadata, new_versions)
+            thread_id = config["configurable"]["thread_id"]
+            self._prune_checkpoints(thread_id, config["configurable"]["checkpoint_ns"])
+            self._touch(thread_id)
+            return result
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        with self._lock:
+            return super().put_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str):
+        with self._lock:
+            self._last_access.pop(thread_id, None)
+            super().delete_thread(thread_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            checkpoint_bytes = sum(
+                len(saved[0][1]) + len(saved[1][1])
+                for namespaces in self.storage.values()
+                for checkpoints in namespaces.values()
+                for saved in checkpoints.values()
+            )
+            blob_bytes = sum(len(blob[1]) for blob in self.blobs.values())
+            write_bytes = sum(
+                len(write[2][1]) for writes in self.writes.values() for write in writes.values()
+            )
+            return {
+                "threads": len(self._last_access),
+                "checkpoints": sum(
+                    len(checkpoints) for namespaces in self.storage.values()
+                    for checkpoints in namespaces.values()
+                ),
+                "blobs": len(self.blobs),
+                "approx_bytes": checkpoint_bytes + blob_bytes + write_bytes,
+                "evictions": self.evictions
+            }
+
+
+class SqliteCheckpointSaver(BaseCheckpointSaver):
+    """File-backed checkpointer on SQLite in WAL mode.
+
+    Several processes on one host can share the same database file, so
+    sessions survive restarts and are visible to every gunicorn worker.
+    Checkpoints are stored whole with the serializer's msgpack encoding
+    (zlib-compressed when large); each put_writes call is one executemany
+    transaction. Message trimming, checkpoint retention and idle-thread
+    expiry mirror BoundedMemorySaver.
+    """
+
+    def __init__(self, path: str = "data/checkpoints.sqlite", ttl_seconds: float = 3600,
+                 max_messages: int = 40, keep_checkpoints: int = 2, serde=None):
+        super().__init__(serde=serde)
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_messages = max_messages
+        self.keep_checkpoints = keep_checkpoints
+        self._local = threading.local()
+        self._last_purge = 0.0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript("""
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL DEFAULT '',
+                checkpoint_id TEXT NOT NULL,
+                parent_checkpoint_id TEXT,
+                type TEXT NOT NULL,
+                checkpoint BLOB NOT NULL,
+                metadata_type TEXT NOT NULL,
+                metadata BLOB NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+            );
+            CREATE INDEX IF NOT EXISTS checkpoints_updated_at ON checkpoints (updated_at);
+            CREATE TABLE IF NOT EXISTS writes (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL DEFAULT '',
+                checkpoint_id TEXT NOT NULL,
+                task_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                channel TEXT NOT NULL,
+                type TEXT NOT NULL,
+                value BLOB NOT NULL,
+                task_path TEXT NOT NULL DEFAULT '',
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+            );
+        """)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, reopening it after a fork."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _dumps(self, value):
+        type_, data = self.serde.dumps_typed(value)
+        if len(data) >= COMPRESS_MIN_BYTES:
+            return f"{type_}+zlib", zlib.compress(data, 1)
+        return type_, data
+
+    def _loads(self, type_: str, data: bytes):
+        if type_.endswith("+zlib"):
+            type_, data = type_[:-len("+zlib")], zlib.decompress(data)
+        return self.serde.loads_typed((type_, data))
+
+    def _to_tuple(self, conn, row) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_id, type_, checkpoint, metadata_type, metadata = row
+        writes = conn.execute(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id)
+        ).fetchall()
+        return CheckpointTuple(
+            config={"configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint_id
+            }},
+            checkpoint=self._loads(type_, checkpoint),
+            metadata=self._loads(metadata_type, metadata),
+            parent_config=(
+                {"configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": parent_id
+                }}
+                if parent_id else None
+            ),
+            pending_writes=[
+                (task_id, channel, self._loads(value_type, value))
+                for task_id, channel, value_type, value in writes
+            ]
+        )
+
+    def _select(self, config, filter=None, before=None, limit=None):
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+            "type, checkpoint, metadata_type, metadata FROM checkpoints"
+        )
+        clauses, params = [], []
+        if config:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            checkpoint_ns = config["configurable"].get("checkpoint_ns")
+            if checkpoint_ns is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+
+        conn = self._connection()
+        for row in conn.execute(query, params):
+            if limit is not None and limit <= 0:
+                break
+            if filter:
+                metadata = self._loads(row[6], row[7])
+                if not all(metadata.get(key) == value for key, value in filter.items()):
+                    continue
+            if limit is not None:
+                limit -= 1
+            yield self._to_tuple(conn, row)
+
+    def get_tuple(self, config):
+        if not get_checkpoint_id(config):
+            config = {"configurable": {
+                **config["configurable"],
+                "checkpoint_ns": config["configurable"].get("checkpoint_ns", "")
+            }}
+        return next(self._select(config, limit=1), None)
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        yield from self._select(config, filter=filter, before=before, limit=limit)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint = trim_checkpoint_messages(checkpoint, self.max_messages)
+        type_, data = self._dumps(checkpoint)
+        metadata_type, metadata_data = self._dumps(get_checkpoint_metadata(config, metadata))
+
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                 type_, data, metadata_type, metadata_data, time.time())
+            )
+            if self.keep_checkpoints:
+                stale = conn.execute(
+                    "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?",
+                    (thread_id, checkpoint_ns, self.keep_checkpoints)
+                ).fetchall()
+                if stale:
+                    keys = [(thread_id, checkpoint_ns, checkpoint_id) for (checkpoint_id,) in stale]
+                    conn.executemany(
+                        "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?", keys
+                    )
+                    conn.executemany(
+                        "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?", keys
+                    )
+        self._purge_expired()
+
+        return {"configurable": {
+            "thread_id": thread_id,
+            "checkpoint_ns": checkpoint_ns,
+            "checkpoint_id": checkpoint["id"]
+        }}
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        """Store one task's pending writes in a single transaction.
+
+        LangGraph calls this once per finished task, and the writes must be
+        durable before the step's checkpoint so a failed step is not re-run
+        from scratch. In this graph every step runs one node (a turn's tool
+        calls all run inside the single "tools" task), so this is one write
+        transaction per step. The write lock is held only for the
+        executemany, and WAL with synchronous=NORMAL does not fsync on commit.
+        """
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, data = self._dumps(value)
+            rows.append((
+                thread_id, checkpoint_ns, checkpoint_id, task_id,
+                WRITES_IDX_MAP.get(channel, idx), channel, type_, data, task_path
+            ))
+        # Special channels (errors, interrupts) replace earlier values; regular
+        # writes are kept as first recorded, matching InMemorySaver.
+        replace = all(channel in WRITES_IDX_MAP for channel, _ in writes)
+        with self._transaction() as conn:
+            conn.executemany(
+                f"INSERT OR {'REPLACE' if replace else 'IGNORE'} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def delete_thread(self, thread_id: str):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+            conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+
+    def _purge_expired(self):
+        now = time.time()
+        if not self.ttl_seconds or now - self._last_purge < PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = now
+        with self._transaction() as conn:
+            expired = conn.execute(
+                "SELECT thread_id FROM checkpoints GROUP BY thread_id HAVING MAX(updated_at) < ?",
+                (now - self.ttl_seconds,)
+            ).fetchall()
+            conn.executemany("DELETE FROM checkpoints WHERE thread_id = ?", expired)
+            conn.executemany("DELETE FROM writes WHERE thread_id = ?", expired)
+
+    # SQLite calls run on worker threads (each with its own connection) so
+    # they never block the event loop.
+    async def aget_tuple(self, config):
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str):
+        return await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def stats(self) -> dict:
+        conn = self._connection()
+        threads, checkpoints, checkpoint_bytes = conn.execute(
+            "SELECT COUNT(DISTINCT thread_id), COUNT(*), COALESCE(SUM(LENGTH(checkpoint)), 0) FROM checkpoints"
+        ).fetchone()
+        writes, write_bytes = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM writes"
+        ).fetchone()
+        return {
+            "threads": threads,
+            "checkpoints": checkpoints,
+            "writes": writes,
+            "approx_bytes": checkpoint_bytes + write_bytes
+        }
+
+
+def create_checkpointer():
+    """Build the checkpointer selected by the CHECKPOINTER environment variable."""
+    backend = os.getenv("CHECKPOINTER", "sqlite").lower()
+    ttl_seconds = float(os.getenv("THREAD_TTL_SECONDS", "3600"))
+    max_messages = int(os.getenv("MAX_THREAD_MESSAGES", "40"))
+    if backend == "memory":
+        return BoundedMemorySaver(
+            max_threads=int(os.getenv("MAX_THREADS", "1000")),
+            ttl_seconds=ttl_seconds,
+            max_messages=max_messages
+        )
+    if backend == "sqlite":
+        return SqliteCheckpointSaver(
+            path=os.getenv("CHECKPOINT_DB", "data/checkpoints.sqlite"),
+            ttl_seconds=ttl_seconds,
+            max_messages=max_messages
+        )
+    raise ValueError(f"Unknown CHECKPOINTER backend: {backend}")
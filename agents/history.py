@@ -0,0 +1,91 @@
+import re
+
+HISTORY_KEEP_TURNS = 3
+HISTORY_TOKEN_BUDGET = 12000
+CHARS_PER_TOKEN = 4
+TOOL_SUMMARY_MAX_TITLES = 8
+TOOL_SUMMARY_FALLBACK_CHARS = 300
+
+_JOB_ID_PATTERN = re.compile(r"/j/([A-Za-z0-9]+)/?")
+_TITLE_LINE_PATTERN = re.compile(r"^Title:\s*(.+)$", re.MULTILINE)
+_SUMMARY_LINE_PATTERN = re.compile(r"^-\s*([^|\n]+?)\s*\|", re.MULTILINE)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (about four characters per token)."""
+    return len(text or "") // CHARS_PER_TOKEN + 1
+
+
+def message_tokens(message: dict) -> int:
+    tokens = estimate_tokens(str(message.get("content") or ""))
+    if message.get("tool_calls"):
+        tokens += estimate_tokens(str(message["tool_calls"]))
+    return tokens
+
+
+def summarize_tool_output(content: str) -> str:
+    """Replace a raw tool result with the job titles and job IDs it mentioned."""
+    content = str(content or "")
+    titles = _TITLE_LINE_PATTERN.findall(content) or _SUMMARY_LINE_PATTERN.findall(content)
+    job_ids = list(dict.fromkeys(_JOB_ID_PATTERN.findall(content)))
+    titles = list(dict.fromkeys(title.strip() for title in titles))
+
+    if not titles and not job_ids:
+        if len(content) <= TOOL_SUMMARY_FALLBACK_CHARS:
+            return content
+        return f"[Earlier tool result, truncated] {content[:TOOL_SUMMARY_FALLBACK_CHARS]}..."
+
+    shown = titles[:TOOL_SUMMARY_MAX_TITLES]
+    summary = f"[Earlier tool result covering {max(len(titles), len(job_ids))} job(s)"
+    if shown:
+        summary += ": " + "; ".join(shown)
+        if len(titles) > len(shown):
+            summary += f"; and {len(titles) - len(shown)} more"
+    if job_ids:
+        summary += f" (job_ids: {', '.join(job_ids)})"
+    return summary + ". Call the tools again if details are needed.]"
+
+
+def split_turns(messages: list) -> list:
+    """Group messages into turns, each starting at a user message."""
+    turns = []
+    for message in messages:
+        if not turns or (isinstance(message, dict) and message.get("role") == "user"):
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def compact_history(messages: list, keep_turns: int = HISTORY_KEEP_TURNS,
+                    token_budget: int = HISTORY_TOKEN_BUDGET, reserved_tokens: int = 0) -> list:
+    """Return the messages to send to the model for this call.
+
+    The last keep_turns turns are kept verbatim. Tool results in older turns
+    are replaced by short summaries. Whole turns are then dropped, oldest
+    first, until the estimate fits within token_budget (including
+    reserved_tokens for the system prompt). The current turn is always kept.
+    """
+    turns = split_turns([message for message in messages if isinstance(message, dict)])
+    if not turns:
+        return []
+
+    keep_from = max(0, len(turns) - max(1, keep_turns))
+    compacted = []
+    for index, turn in enumerate(turns):
+        if index >= keep_from:
+            compacted.append(turn)
+            continue
+        compacted.append([
+            {**message, "content": summarize_tool_output(message.get("content"))}
+            if message.get("role") == "tool" else message
+            for message in turn
+        ])
+
+    turn_tokens = [sum(message_tokens(message) for message in turn) for turn in compacted]
+    total = reserved_tokens + sum(turn_tokens)
+    start = 0
+    while total > token_budget and start < len(compacted) - 1:
+        total -= turn_tokens[start]
+        start += 1
+
+    return [message for turn in compacted[start:] for message in turn]
@@ -1,176 +1,162 @@
 from langgraph.graph import StateGraph, END
-from langgraph.prebuilt import ToolNode
-from langgraph.checkpoint.memory import InMemorySaver
-from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.messages import HumanMessage, AIMessage, AIMessageChunk, ToolMessage
+from langchain_core.runnables import RunnableLambda
 from langchain_core.tools import tool
-from typing import List, Dict, Any, TypedDict, Annotated
-from tools.rag_retriever import JobRetriever
+from typing import List, Dict, Any, Optional, TypedDict, Annotated
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from tools.llm_gateway import gateway, track_usage, usage_source, estimate_cost
+from agents.checkpointing import create_checkpointer
+from agents.history import compact_history, estimate_tokens
+from agents.app_context import app_context
+from agents.tracing import tracer
+from agents.steps import Step, run_steps, arun_steps, step_tool
+from tools.job_catalog import render_job_content, render_job_summary
 import os
 from dotenv import load_dotenv
 import operator
-from datetime import datetime
 import json
 from colorama import Fore, Back, Style, init
-import re
-from tools.compare_jobs import compare_jobs
-from tools.summarize_career import summarize_career
+from tools.compare_jobs import compare_jobs, acompare_jobs
+from tools.summarize_career import summarize_career, asummarize_career
 from tools.location_filter import filter_by_location
 
 init(autoreset=True)
 
 load_dotenv()
 
-class AgentState(TypedDict):
-    messages: Annotated[List[Dict], operator.add]
-    rag_context: str 
+MAX_TOOL_LEDGER_SIZE = 256
+TOOL_MAX_WORKERS = int(os.getenv("TOOL_MAX_WORKERS", "4"))
+TOOL_TIMEOUT_SECONDS = float(os.getenv("TOOL_TIMEOUT_SECONDS", "60"))
+STREAM_MODES = ["tasks", "updates", "messages"]
 
-class FlowTracer:
-    """Enhanced visual tracer for LangGraph execution flow"""
-    def __init__(self):
-        self.step_count = 0
-        self.indent_level = 0
-        self.start_time = datetime.now()
-        
-    def log_step(self, step_type: str, description: str, data: Any = None):
-        """Log a step with visual formatting"""
-        self.step_count += 1
-        timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-        indent = "  " * self.indent_level
-        
-        colors = {
-            "USER": Fore.CYAN,
-            "AGENT": Fore.GREEN, 
-            "TOOL": Fore.YELLOW,
-            "DECISION": Fore.MAGENTA,
-            "ERROR": Fore.RED,
-            "INFO": Fore.BLUE,
-            "RAG": Fore.LIGHTMAGENTA_EX
-        }
-        
-        color = colors.get(step_type, Fore.WHITE)
-        
-        print(f"\n{color}{'='*60}")
-        print(f"{color}[{timestamp}] STEP {self.step_count}: {step_type}")
-        print(f"{color}{'='*60}")
-        print(f"{color}{indent}📝 {description}")
-        
-        if data:
-            print(f"{color}{indent}📊 Data:")
-            if isinstance(data, dict):
-                for key, value in data.items():
-                    if isinstance(value, str) and len(value) > 100:
-                        value = value[:100] + "..."
-                    print(f"{color}{indent}   {key}: {value}")
-            elif isinstance(data, str):
-                preview = data[:200] + "..." if len(data) > 200 else data
-                print(f"{color}{indent}   {preview}")
-            else:
-                print(f"{color}{indent}   {str(data)}")
-        
-        print(f"{color}{'='*60}{Style.RESET_ALL}")
-    
-    def log_flow_transition(self, from_node: str, to_node: str, condition: str = None):
-        print(f"\n{Fore.BLUE}🔄 FLOW: {from_node} → {to_node}")
-        if condition:
-            print(f"{Fore.BLUE}   Condition: {condition}")
-        print(f"{Fore.BLUE}{'─'*40}")
-    
-    def indent(self):
-        self.indent_level += 1
-    
-    def dedent(self):
-        self.indent_level = max(0, self.indent_level - 1)
-    
-    def log_summary(self, messages: List[Dict]):
-        """Log a summary of the conversation"""
-        print(f"\n{Back.BLUE}{Fore.WHITE}📋 CONVERSATION SUMMARY{Style.RESET_ALL}")
-        print(f"{Fore.BLUE}{'='*50}")
-        for i, msg in enumerate(messages):
-            role = msg.get("role", "unknown")
-            content = msg.get("content", "")
-            tool_calls = msg.get("tool_calls", [])
-            if role == "user":
-                print(f"{Fore.CYAN}👤 User: {content}")
-            elif role == "assistant":
-                if tool_calls:
-                    print(f"{Fore.GREEN}🤖 Assistant: [Tool calls made]")
-                    for tc in tool_calls:
-                        print(f"{Fore.GREEN}   🔧 {tc.get('name', 'unknown')}({tc.get('args', {})})")
-                else:
-                    preview = content[:100] + "..." if len(content) > 100 else content
-                    print(f"{Fore.GREEN}🤖 Assistant: {preview}")
-            elif role == "tool":
-                preview = content[:100] + "..." if len(content) > 100 else content
-                print(f"{Fore.YELLOW}🔧 Tool Result: {preview}")
-        print(f"{Fore.BLUE}{'='*50}{Style.RESET_ALL}")
 
-tracer = FlowTracer()
+def merge_tool_ledger(existing: List[str], new: List[str]) -> List[str]:
+    """Append executed tool call IDs, keeping only the most recent entries."""
+    merged = list(existing or [])
+    for tool_call_id in new or []:
+        if tool_call_id not in merged:
+            merged.append(tool_call_id)
+    return merged[-MAX_TOOL_LEDGER_SIZE:]
 
 
+def merge_usage(existing: Dict, new: Dict) -> Dict:
+    """Add a node's LLM usage summary to the thread's running totals."""
+    merged = dict(existing or {})
+    for key, value in (new or {}).items():
+        if isinstance(value, dict):
+            merged[key] = merge_usage(merged.get(key), value)
+        elif isinstance(value, (int, float)):
+            merged[key] = round(merged.get(key, 0) + value, 6)
+    if "input_tokens" in merged and "estimated_cost_usd" in merged:
+        merged["estimated_cost_usd"] = estimate_cost(merged["input_tokens"], merged["output_tokens"])
+    return merged
 
-retriever = JobRetriever()
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash",
-    google_api_key=os.getenv("GOOGLE_API_KEY"),
-    temperature=0
-)
 
-@tool
-def retrieve_jobs(query: str) -> str:
-    """Retrieve relevant job information from the database based on a specific query. Best for targeted searches about specific roles, skills, or departments."""
-    tracer.log_step("TOOL", "Retrieving jobs from database", {"query": query})
-    tracer.indent()
-    
-    docs = retriever.retrieve(query, k=5)
+class AgentState(TypedDict):
+    messages: Annotated[List[Dict], operator.add]
+    rag_context: str 
+    executed_tool_calls: Annotated[List[str], merge_tool_ledger]
+    usage: Annotated[Dict, merge_usage]
+
+
+def log_summary(messages: List[Dict]):
+    """Log a summary of the conversation"""
+    print(f"\n{Back.BLUE}{Fore.WHITE}📋 CONVERSATION SUMMARY{Style.RESET_ALL}")
+    print(f"{Fore.BLUE}{'='*50}")
+    for i, msg in enumerate(messages):
+        role = msg.get("role", "unknown")
+        content = msg.get("content", "")
+        tool_calls = msg.get("tool_calls", [])
+        if role == "user":
+            print(f"{Fore.CYAN}👤 User: {content}")
+        elif role == "assistant":
+            if tool_calls:
+                print(f"{Fore.GREEN}🤖 Assistant: [Tool calls made]")
+                for tc in tool_calls:
+                    print(f"{Fore.GREEN}   🔧 {tc.get('name', 'unknown')}({tc.get('args', {})})")
+            else:
+                preview = content[:100] + "..." if len(content) > 100 else content
+                print(f"{Fore.GREEN}🤖 Assistant: {preview}")
+        elif role == "tool":
+            preview = content[:100] + "..." if len(content) > 100 else content
+            print(f"{Fore.YELLOW}🔧 Tool Result: {preview}")
+    print(f"{Fore.BLUE}{'='*50}{Style.RESET_ALL}")
+
+
+def job_filters(department: str = None, job_type: str = None, workplace_type: str = None, location: str = None) -> dict:
+    filters = {
+        "department": department,
+        "job_type": job_type,
+        "workplace_type": workplace_type,
+        "location": location
+    }
+    return {field: value for field, value in filters.items() if value}
+
+def drop_unknown_location(filters: dict) -> str:
+    """Remove a location naming no listed place from filters; returns a note for the answer, or ""."""
+    location = filters.get("location")
+    if not location or app_context.retriever.locations.query_terms(location):
+        return ""
+    del filters["location"]
+    tracer.log_step("INFO", "Location matches no listed place, searching without it")
+    return f"Note: no open positions list a location matching '{location}', so no location filter was applied.\n\n"
+
+def retrieved_jobs_result(docs, filters: dict, note: str = "") -> str:
+    if not docs and filters:
+        tracer.log_step("INFO", "No jobs match the requested filters")
+        return note + f"No open positions match {', '.join(f'{field}={value}' for field, value in filters.items())}."
     result = "\n\n".join([doc.page_content for doc in docs])
     
     tracer.log_step("INFO", f"Retrieved {len(docs)} documents, {len(result)} characters total")
-    tracer.dedent()
-    return result
+    return note + result
+
+# Tools with blocking work are written once as generators of Steps (see
+# agents/steps.py): invoke runs each step directly, ainvoke awaits it.
+@step_tool
+def retrieve_jobs(query: str, department: Optional[str] = None, job_type: Optional[str] = None,
+                  workplace_type: Optional[str] = None, location: Optional[str] = None):
+    """Retrieve relevant job information from the database based on a specific query. Best for targeted searches about specific roles, skills, or departments. Set department, job_type (e.g. "Full time", "Contract"), workplace_type (e.g. "On-site", "Hybrid", "Remote") or location (city or country) only when the user asks for them explicitly; results then match those fields exactly."""
+    filters = job_filters(department, job_type, workplace_type, location)
+    tracer.log_step("TOOL", "Retrieving jobs from database", {"query_chars": len(query), "filters": filters})
+    
+    note = drop_unknown_location(filters)
+    retriever = app_context.retriever
+    docs = yield Step(retriever.retrieve, retriever.aretrieve, query, k=5, filters=filters)
+    return retrieved_jobs_result(docs, filters, note)
 
 @tool
-def list_all_jobs() -> str:
-    """Retrieve a comprehensive list of all available job positions at EVA Pharma. Use this when users want to see all open positions, available jobs, or get a broad overview of opportunities."""
-    tracer.log_step("TOOL", "Listing all available jobs")
-    tracer.indent()
-    
-    broad_queries = [
-        "job position role",
-        "department location",
-        "engineer manager analyst",
-        "coordinator specialist assistant",
-        "pharma medical sales",
-        "all available jobs",
-        "full-time part-time",
-        "remote onsite hybrid"
-    ]
-    
-    all_docs = []
-    seen_job_ids = set()
-    
-    for query in broad_queries:
-        docs = retriever.retrieve(query, k=50)  
-        for doc in docs:
-            job_id = doc.metadata.get("job_id")
-            if job_id and job_id not in seen_job_ids:
-                all_docs.append(doc)
-                seen_job_ids.add(job_id)
-    
-    all_docs.sort(key=lambda x: x.metadata.get("job_id", ""))
-    
-    result = "\n\n".join([doc.page_content for doc in all_docs])
-    
-    tracer.log_step("INFO", f"Retrieved {len(all_docs)} unique jobs, {len(result)} characters total")
-    tracer.dedent()
+def list_all_jobs(page: int = 1, page_size: int = 20, detailed: bool = False) -> str:
+    """Retrieve a comprehensive list of all available job positions at EVA Pharma. Use this when users want to see all open positions, available jobs, or get a broad overview of opportunities. Results are paged; set detailed=True only when full job descriptions are needed."""
+    tracer.log_step("TOOL", "Listing all available jobs", {
+        "page": page,
+        "page_size": page_size,
+        "detailed": detailed
+    })
+    
+    catalog = app_context.retriever.catalog
+    jobs, total_pages = catalog.page(page, page_size)
+    page = min(max(1, page), total_pages)
+    
+    if detailed:
+        body = "\n\n".join([render_job_content(job) for job in jobs])
+    else:
+        body = "\n".join([f"- {render_job_summary(job)}" for job in jobs])
+    
+    header = f"Showing {len(jobs)} of {len(catalog)} open positions (page {page} of {total_pages})."
+    if page < total_pages:
+        header += f" Request page={page + 1} for more."
+    result = f"{header}\n\n{body}"
+    
+    tracer.log_step("INFO", f"Listed {len(jobs)} of {len(catalog)} jobs, {len(result)} characters total")
     return result
 
-@tool
-def compare_jobs_tool(job_titles: str) -> str:
-    """Compare two job roles. Input should be two job titles separated by 'vs' or 'and'."""
-    tracer.log_step("TOOL", "Comparing job roles", {"job_titles": job_titles})
-    tracer.indent()
-    
+def split_job_titles(job_titles: str):
+    """Split the tool input into two job titles; returns (titles, error message)."""
     job_titles_clean = job_titles.lower().strip()
     
     jobs = []
@@ -189,121 +175,205 @@ def compare_jobs_tool(job_titles: str) -> str:
             jobs = [' '.join(words[:mid_point]), ' '.join(words[mid_point:])]
         else:
             tracer.log_step("ERROR", "Could not identify two distinct job titles")
-            tracer.dedent()
-            return "Please specify two jobs to compare using format like 'UX Designer vs Motion Graphics Designer' or 'UX Designer and Motion Graphics Designer'"
+            return None, "Please specify two jobs to compare using format like 'UX Designer vs Motion Graphics Designer' or 'UX Designer and Motion Graphics Designer'"
     
     if len(jobs) < 2:
         tracer.log_step("ERROR", "Less than 2 jobs identified")
-        tracer.dedent()
-        return "Please specify exactly two jobs to compare. Example: 'UX Designer vs Motion Graphics Designer'"
-    
-    job1_title = jobs[0].strip()
-    job2_title = jobs[1].strip()
-    
-    tracer.log_step("INFO", f"Comparing: '{job1_title}' vs '{job2_title}'")
-    
-    def get_comprehensive_job_info(job_title: str) -> str:
-        """Get comprehensive information about a specific job."""
-        
-        queries = [
-            job_title, 
-            f"{job_title} responsibilities duties",  
-            f"{job_title} requirements qualifications skills",  
-            f"{job_title} job description role",  
-            f"{job_title} experience level career" 
-        ]
-        
-        all_docs = []
-        seen_content = set()
-        
-        for query in queries:
-            docs = retriever.retrieve(query, k=3)
-            for doc in docs:
-                content_hash = hash(doc.page_content[:200]) 
-                if content_hash not in seen_content:
-                    all_docs.append(doc)
-                    seen_content.add(content_hash)
-        
-        job_specific_docs = []
-        general_docs = []
-        
-        for doc in all_docs:
-            if job_title.lower() in doc.page_content.lower():
-                job_specific_docs.append(doc)
-            else:
-                general_docs.append(doc)
-        
-        prioritized_docs = job_specific_docs + general_docs[:3] 
-        
-        return "\n\n".join([doc.page_content for doc in prioritized_docs[:5]]) 
+        return None, "Please specify exactly two jobs to compare. Example: 'UX Designer vs Motion Graphics Designer'"
     
+    titles = [jobs[0].strip(), jobs[1].strip()]
+    tracer.log_step("INFO", f"Comparing: '{titles[0]}' vs '{titles[1]}'")
+    return titles, None
 
-    tracer.log_step("INFO", f"Retrieving comprehensive info for '{job1_title}'")
-    job1_info = get_comprehensive_job_info(job1_title)
+def retrieved_job_info(job_title: str, docs) -> str:
+    """Format retrieved postings, putting the ones that mention the title first."""
+    job_specific_docs = []
+    general_docs = []
     
-    tracer.log_step("INFO", f"Retrieving comprehensive info for '{job2_title}'")  
-    job2_info = get_comprehensive_job_info(job2_title)
+    for doc in docs:
+        if job_title.lower() in doc.page_content.lower():
+            job_specific_docs.append(doc)
+        else:
+            general_docs.append(doc)
+    
+    prioritized_docs = job_specific_docs + general_docs[:3] 
+    
+    return "\n\n".join([doc.page_content for doc in prioritized_docs[:5]]) 
+
+def catalog_job_info(titles: List[str]):
+    """Job info for titles naming catalog postings; returns (infos by title, unresolved titles)."""
+    # Titles naming a posting are answered from the catalog; only the rest
+    # need retrieval, done as one batched embedding call for both sides.
+    infos = {}
+    unresolved = []
+    for job_title in titles:
+        matches = app_context.retriever.catalog.find_by_title(job_title)
+        if matches:
+            tracer.log_step("INFO", f"Resolved '{job_title}' to {len(matches)} catalog posting(s)", {
+                "job_ids": [job["job_id"] for job in matches]
+            })
+            infos[job_title] = "\n\n".join(render_job_content(job) for job in matches[:3])
+        else:
+            unresolved.append(job_title)
+    if unresolved:
+        tracer.log_step("INFO", f"Retrieving info for {unresolved}")
+    return infos, unresolved
+
+def missing_job_info(titles: List[str], infos: dict):
+    for job_title in titles:
+        if not infos[job_title].strip():
+            tracer.log_step("ERROR", f"No information found for '{job_title}'")
+            return f"I couldn't find detailed information about '{job_title}'. Please check the job title spelling or try a more general term."
+    return None
+
+@step_tool
+def compare_jobs_tool(job_titles: str):
+    """Compare two job roles. Input should be two job titles separated by 'vs' or 'and'."""
+    tracer.log_step("TOOL", "Comparing job roles", {"job_titles": job_titles})
     
-
-    if not job1_info.strip():
-        tracer.log_step("ERROR", f"No information found for '{job1_title}'")
-        tracer.dedent()
-        return f"I couldn't find detailed information about '{job1_title}'. Please check the job title spelling or try a more general term."
+    titles, error = split_job_titles(job_titles)
+    if error:
+        return error
     
-    if not job2_info.strip():
-        tracer.log_step("ERROR", f"No information found for '{job2_title}'")
-        tracer.dedent()
-        return f"I couldn't find detailed information about '{job2_title}'. Please check the job title spelling or try a more general term."
+    infos, unresolved = catalog_job_info(titles)
+    if unresolved:
+        retriever = app_context.retriever
+        docs_by_title = yield Step(retriever.retrieve_many, retriever.aretrieve_many, unresolved, k=8)
+        for job_title, docs in zip(unresolved, docs_by_title):
+            infos[job_title] = retrieved_job_info(job_title, docs)
     
+    error = missing_job_info(titles, infos)
+    if error:
+        return error
 
     tracer.log_step("INFO", "Generating detailed comparison")
-    result = compare_jobs(job1_info, job2_info, job1_title, job2_title)
+    result = yield Step(compare_jobs, acompare_jobs, infos[titles[0]], infos[titles[1]], titles[0], titles[1])
     
     tracer.log_step("INFO", f"Comparison completed, {len(result)} characters")
-    tracer.dedent()
     return result
 
-@tool
-def summarize_career_tool(query: str) -> str:
+@step_tool
+def summarize_career_tool(query: str):
     """Summarize career path and growth opportunities for a job."""
-    tracer.log_step("TOOL", "Summarizing career path", {"query": query})
-    tracer.indent()
+    tracer.log_step("TOOL", "Summarizing career path", {"query_chars": len(query)})
     
-    docs = retriever.retrieve(query, k=5)
+    retriever = app_context.retriever
+    docs = yield Step(retriever.retrieve, retriever.aretrieve, query, k=5)
     job_info = "\n\n".join([doc.page_content for doc in docs])
     
-    result = summarize_career(job_info, query)
+    result = yield Step(summarize_career, asummarize_career, job_info, query)
     tracer.log_step("INFO", f"Career summary completed, {len(result)} characters")
-    tracer.dedent()
     return result
 
 @tool
 def location_filter_tool(location: str) -> str:
     """Filter jobs by specific location."""
     tracer.log_step("TOOL", "Filtering jobs by location", {"location": location})
-    tracer.indent()
-    
-    docs = retriever.retrieve(f"location {location}", k=10)
-    jobs_info = "\n\n".join([doc.page_content for doc in docs])
     
-    result = filter_by_location(jobs_info, location)
+    result = filter_by_location(app_context.retriever.locations, location)
     tracer.log_step("INFO", f"Location filtering completed, {len(result)} characters")
-    tracer.dedent()
     return result
 
-
+# Tools without an async form (pure in-memory lookups) run on a worker
+# thread under ainvoke/astream.
 tools = [retrieve_jobs, list_all_jobs, compare_jobs_tool, summarize_career_tool, location_filter_tool]
 
+tools_by_name = {t.name: t for t in tools}
+
+def tool_error(tool_call: dict, content: str) -> ToolMessage:
+    return ToolMessage(content=content, tool_call_id=tool_call.get("id", ""), status="error")
 
-llm_with_tools = llm.bind_tools(tools)
+def unknown_tool_error(tool_call: dict) -> ToolMessage:
+    return tool_error(
+        tool_call,
+        f"Error: {tool_call.get('name')} is not a valid tool, try one of [{', '.join(tools_by_name)}]."
+    )
+
+def tool_timeout_error(tool_call: dict) -> ToolMessage:
+    tracer.log_step("ERROR", f"Tool {tool_call.get('name')} timed out after {TOOL_TIMEOUT_SECONDS:g}s")
+    return tool_error(tool_call, f"Error: {tool_call.get('name')} timed out after {TOOL_TIMEOUT_SECONDS:g} seconds.")
+
+async def ainvoke_with_timeout(selected_tool, tool_input: dict):
+    return await asyncio.wait_for(selected_tool.ainvoke(tool_input), TOOL_TIMEOUT_SECONDS)
+
+def tool_call_steps(tool_call: dict):
+    """Run one tool call, turning failures into an error result the model can read.
+
+    On the event loop the call gets TOOL_TIMEOUT_SECONDS to finish; the sync
+    path enforces the same limit in run_tool_calls.
+    """
+    selected_tool = tools_by_name.get(tool_call.get("name"))
+    if selected_tool is None:
+        return unknown_tool_error(tool_call)
+    with tracer.span(f"tool.{selected_tool.name}", tool_call_id=tool_call.get("id")), \
+            usage_source(f"tool.{selected_tool.name}"):
+        try:
+            return (yield Step(
+                selected_tool.invoke, functools.partial(ainvoke_with_timeout, selected_tool),
+                {**tool_call, "type": "tool_call"}
+            ))
+        except asyncio.TimeoutError:
+            return tool_timeout_error(tool_call)
+        except Exception as e:
+            tracer.log_step("ERROR", f"Tool {selected_tool.name} failed: {repr(e)}")
+            return tool_error(tool_call, f"Error: {repr(e)}\n Please fix your mistakes.")
+
+def run_tool_call(tool_call: dict) -> ToolMessage:
+    return run_steps(tool_call_steps(tool_call))
+
+async def arun_tool_call(tool_call: dict) -> ToolMessage:
+    return await arun_steps(tool_call_steps(tool_call))
+
+def run_tool_calls(tool_calls: List[dict]) -> List[ToolMessage]:
+    """Run one assistant turn's tool calls, returning results in call order.
+
+    Calls run concurrently on a pool owned by this turn (at most
+    TOOL_MAX_WORKERS threads), each in a copy of the caller's context. A
+    call gets TOOL_TIMEOUT_SECONDS from when it starts running, as in
+    arun_tool_calls; one that overruns is reported as an error result (its
+    thread finishes in the background).
+    """
+    started_at = [None] * len(tool_calls)
+    started = [threading.Event() for _ in tool_calls]
+    
+    def run(index: int, tool_call: dict) -> ToolMessage:
+        started_at[index] = time.monotonic()
+        started[index].set()
+        return run_tool_call(tool_call)
+    
+    executor = ThreadPoolExecutor(max_workers=min(TOOL_MAX_WORKERS, len(tool_calls)), thread_name_prefix="tool")
+    try:
+        futures = [
+            executor.submit(contextvars.copy_context().run, run, index, tool_call)
+            for index, tool_call in enumerate(tool_calls)
+        ]
+        results = []
+        for index, (tool_call, future) in enumerate(zip(tool_calls, futures)):
+            # A queued call only waits behind this turn's own calls, so a worker
+            # frees up within the timeout unless one of them overran.
+            if not started[index].wait(TOOL_TIMEOUT_SECONDS):
+                future.cancel()
+                results.append(tool_timeout_error(tool_call))
+                continue
+            remaining = max(0.0, started_at[index] + TOOL_TIMEOUT_SECONDS - time.monotonic())
+            try:
+                results.append(future.result(timeout=remaining))
+            except FutureTimeoutError:
+                results.append(tool_timeout_error(tool_call))
+        return results
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+async def arun_tool_calls(tool_calls: List[dict]) -> List[ToolMessage]:
+    """Run tool calls concurrently on the event loop, returning results in call order."""
+    return list(await asyncio.gather(*(arun_tool_call(tool_call) for tool_call in tool_calls)))
 
 def retrieve_job_context(query: str) -> str:
     """Retrieve job context for the query."""
-    tracer.log_step("RAG", "Retrieving job context", {"query": query})
-    tracer.indent()
+    tracer.log_step("RAG", "Retrieving job context", {"query_chars": len(query)})
     
     try:
-        docs = retriever.retrieve(query, k=5)
+        docs = app_context.retriever.retrieve(query, k=5)
         context = "\n\n".join([doc.page_content for doc in docs])
         
         tracer.log_step("INFO", f"Retrieved {len(docs)} documents for context", {
@@ -311,18 +381,15 @@ def retrieve_job_context(query: str) -> str:
             "preview": context[:200] + "..." if len(context) > 200 else context
         })
         
-        tracer.dedent()
         return context
         
     except Exception as e:
         tracer.log_step("ERROR", f"Failed to retrieve context: {str(e)}")
-        tracer.dedent()
         return ""
 
 def should_continue(state: AgentState) -> str:
     """Determine if we should continue to tools, retrieve context, or end."""
     tracer.log_step("DECISION", "Evaluating next step")
-    tracer.indent()
     
     messages = state["messages"]
     last_message = messages[-1]
@@ -348,29 +415,25 @@ def should_continue(state: AgentState) -> str:
     if message_role == "assistant" and has_tool_calls:
         tracer.log_step("DECISION", "Assistant message with tool calls → Going to tools")
         tracer.log_flow_transition("agent", "tools", "tool_calls found")
-        tracer.dedent()
         return "tools"
     
     if message_role == "tool":
         tracer.log_step("DECISION", "Tool message found → Going back to agent for response refinement")
         tracer.log_flow_transition("tools", "agent", "tool response needs refinement")
-        tracer.dedent()
         return "agent" 
     
     if message_role == "assistant" and not has_tool_calls:
         tracer.log_step("DECISION", "Final assistant response → Ending conversation")
         tracer.log_flow_transition("agent", "END", "final response")
-        tracer.dedent()
         return END
     
     tracer.log_step("DECISION", "Continuing conversation flow")
-    tracer.dedent()
     return "agent"
 
+@tracer.traced("node.rag_retrieval")
 def rag_retrieval_node(state: AgentState) -> Dict[str, Any]:
     """Node to retrieve job context using RAG."""
     tracer.log_step("RAG", "RAG Retrieval Node")
-    tracer.indent()
     
     messages = state["messages"]
     user_query = ""
@@ -384,17 +447,13 @@ def rag_retrieval_node(state: AgentState) -> Dict[str, Any]:
     
     tracer.log_step("INFO", "RAG context retrieved", {
         "context_length": len(context),
-        "query": user_query
+        "query_chars": len(user_query)
     })
     
-    tracer.dedent()
     return {"rag_context": context}
 
-def call_model(state: AgentState) -> Dict[str, List]:
-    """Call the model with the current state - enhanced to handle tool responses better."""
-    tracer.log_step("AGENT", "Calling language model")
-    tracer.indent()
-    
+def build_model_messages(state: AgentState):
+    """System prompt plus compacted history for the agent node; returns (messages, has_recent_tool_results)."""
     messages = state["messages"]
     rag_context = state.get("rag_context", "")
     
@@ -413,7 +472,7 @@ def call_model(state: AgentState) -> Dict[str, List]:
 
 Tools Available:
 - retrieve_jobs: Fetch relevant job listings for specific queries about roles, skills, requirements, responsibilities, type, workplace or departments
-- list_all_jobs: Get a comprehensive overview of ALL available positions at EVA Pharma
+- list_all_jobs: Get a comprehensive overview of ALL available positions at EVA Pharma (paged one-line summaries; request further pages or detailed=True when needed)
 - compare_jobs_tool: Compare responsibilities and qualifications of two job roles
 - summarize_career_tool: Provide information on typical career growth paths
 - location_filter_tool: Show jobs available in a specific city or region
@@ -473,8 +532,15 @@ IMPORTANT: You have just received tool results. Your task is to process this raw
 
     system_message = {"role": "system", "content": system_content}
     
+    history = compact_history(messages, reserved_tokens=estimate_tokens(system_content))
+    tracer.log_step("INFO", f"Sending {len(history)} of {len(messages)} messages to the model", {
+        "estimated_prompt_tokens": estimate_tokens(system_content) + sum(
+            estimate_tokens(str(msg.get("content") or "")) for msg in history
+        )
+    })
+    
     formatted_messages = [system_message]
-    for msg in messages:
+    for msg in history:
         if isinstance(msg, dict):
             if msg.get("role") == "user":
                 formatted_messages.append(HumanMessage(content=msg["content"]))
@@ -491,19 +557,15 @@ IMPORTANT: You have just received tool results. Your task is to process this raw
                     tool_call_id=msg.get("tool_call_id", "")
                 ))
     
-    try:
-        response = llm_with_tools.invoke(formatted_messages)
-        
-        tracer.log_step("INFO", "LLM response received", {
-            "content_length": len(response.content) if response.content else 0,
-            "has_tool_calls": bool(hasattr(response, 'tool_calls') and response.tool_calls),
-            "processing_tool_results": has_recent_tool_results
-        })
-        
-    except Exception as e:
-        tracer.log_step("ERROR", f"LLM invocation failed: {str(e)}")
-        tracer.dedent()
-        raise
+    return formatted_messages, has_recent_tool_results
+
+def model_update(response, usage, has_recent_tool_results: bool) -> Dict[str, List]:
+    """State update for the model's response."""
+    tracer.log_step("INFO", "LLM response received", {
+        "content_length": len(response.content) if response.content else 0,
+        "has_tool_calls": bool(hasattr(response, 'tool_calls') and response.tool_calls),
+        "processing_tool_results": has_recent_tool_results
+    })
     
     response_dict = {
         "role": "assistant",
@@ -513,41 +575,57 @@ IMPORTANT: You have just received tool results. Your task is to process this raw
     if hasattr(response, 'tool_calls') and response.tool_calls:
         response_dict["tool_calls"] = response.tool_calls
     
-    tracer.dedent()
-    return {"messages": [response_dict]}
+    return {"messages": [response_dict], "usage": usage.summary()}
 
-def handle_tools(state: AgentState) -> Dict[str, List]:
-    """Handle tool execution and return tool messages."""
-    tracer.log_step("TOOL", "Executing tools")
-    tracer.indent()
-    
-    messages = state["messages"]
-    last_message = messages[-1]
-    
-    tool_node = ToolNode(tools)
-    
-    formatted_messages = []
-    for msg in messages:
-        if isinstance(msg, dict):
-            if msg.get("role") == "assistant" and msg.get("tool_calls"):
-                ai_msg = AIMessage(content=msg.get("content", ""))
-                ai_msg.tool_calls = msg["tool_calls"]
-                formatted_messages.append(ai_msg)
-    
-    tracer.log_step("INFO", f"Executing {len(formatted_messages)} tool messages")
+def model_steps(state: AgentState):
+    tracer.log_step("AGENT", "Calling language model")
     
+    formatted_messages, has_recent_tool_results = build_model_messages(state)
+    chat_model = gateway.chat_model(temperature=0, tools=tools)
     try:
-        tool_result = tool_node.invoke({"messages": formatted_messages})
-        
-        tracer.log_step("INFO", f"Tools executed successfully, {len(tool_result['messages'])} results")
-        
+        with tracer.span("llm.chat", messages=len(formatted_messages)), \
+                track_usage() as usage, usage_source("call_model"):
+            response = yield Step(gateway.invoke_chat, gateway.ainvoke_chat, chat_model, formatted_messages)
     except Exception as e:
-        tracer.log_step("ERROR", f"Tool execution failed: {str(e)}")
-        tracer.dedent()
+        tracer.log_step("ERROR", f"LLM invocation failed: {str(e)}")
         raise
     
+    return model_update(response, usage, has_recent_tool_results)
+
+@tracer.traced("node.agent")
+def call_model(state: AgentState) -> Dict[str, List]:
+    """Call the model with the current state - enhanced to handle tool responses better."""
+    return run_steps(model_steps(state))
+
+@tracer.traced("node.agent")
+async def acall_model(state: AgentState) -> Dict[str, List]:
+    """Async call_model, used when the graph runs with ainvoke/astream."""
+    return await arun_steps(model_steps(state))
+
+def pending_tool_calls(state: AgentState) -> List[dict]:
+    """Tool calls of the latest assistant message that have not run yet."""
+    messages = state["messages"]
+    last_message = messages[-1]
+    executed = set(state.get("executed_tool_calls") or [])
+    
+    pending_calls = [
+        tc for tc in (last_message.get("tool_calls") or [])
+        if tc.get("id") not in executed
+    ] if isinstance(last_message, dict) else []
+    
+    if pending_calls:
+        tracer.log_step("INFO", f"Executing {len(pending_calls)} pending tool calls", {
+            "skipped_already_executed": len(last_message.get("tool_calls", [])) - len(pending_calls),
+            "concurrent": len(pending_calls) > 1
+        })
+    else:
+        tracer.log_step("INFO", "No pending tool calls, skipping execution")
+    return pending_calls
+
+def tools_update(pending_calls: List[dict], tool_results: List[ToolMessage], usage) -> Dict[str, List]:
+    """State update recording the tool results and the calls that produced them."""
     tool_messages = []
-    for i, msg in enumerate(tool_result["messages"]):
+    for i, msg in enumerate(tool_results):
         if isinstance(msg, ToolMessage):
             tool_messages.append({
                 "role": "tool",
@@ -559,18 +637,56 @@ def handle_tools(state: AgentState) -> Dict[str, List]:
                 "tool_call_id": msg.tool_call_id
             })
     
-    tracer.dedent()
-    return {"messages": tool_messages}
+    return {
+        "messages": tool_messages,
+        "executed_tool_calls": [tc["id"] for tc in pending_calls if tc.get("id")],
+        "usage": usage.summary()
+    }
+
+def tools_steps(state: AgentState):
+    tracer.log_step("TOOL", "Executing tools")
+    
+    pending_calls = pending_tool_calls(state)
+    if not pending_calls:
+        return {"messages": []}
+    
+    started = time.monotonic()
+    try:
+        with track_usage() as usage:
+            tool_results = yield Step(run_tool_calls, arun_tool_calls, pending_calls)
+        
+        tracer.log_step("INFO", f"Tools executed successfully, {len(tool_results)} results", {
+            "elapsed_seconds": round(time.monotonic() - started, 3)
+        })
+        
+    except Exception as e:
+        tracer.log_step("ERROR", f"Tool execution failed: {str(e)}")
+        raise
+    
+    return tools_update(pending_calls, tool_results, usage)
 
-def get_agent():
+@tracer.traced("node.tools")
+def handle_tools(state: AgentState) -> Dict[str, List]:
+    """Execute only the pending tool calls of the latest assistant message."""
+    return run_steps(tools_steps(state))
+
+@tracer.traced("node.tools")
+async def ahandle_tools(state: AgentState) -> Dict[str, List]:
+    """Async handle_tools: pending calls run as concurrent tasks on the event loop."""
+    return await arun_steps(tools_steps(state))
+
+def get_agent(checkpointer=None):
     """Create and return the agent workflow with improved flow logic."""
     tracer.log_step("INFO", "Creating enhanced agent workflow with improved flow")
     
-    checkpointer = InMemorySaver()
+    if checkpointer is None:
+        checkpointer = create_checkpointer()
     workflow = StateGraph(AgentState)
     
-    workflow.add_node("agent", call_model)
-    workflow.add_node("tools", handle_tools)
+    # Each node runs one shared implementation, synchronously under
+    # invoke/stream and on the event loop under ainvoke/astream.
+    workflow.add_node("agent", RunnableLambda(call_model, afunc=acall_model, name="agent"))
+    workflow.add_node("tools", RunnableLambda(handle_tools, afunc=ahandle_tools, name="tools"))
     workflow.add_node("rag_retrieval", rag_retrieval_node)
     workflow.set_entry_point("agent")
     workflow.add_conditional_edges(
@@ -590,10 +706,136 @@ def get_agent():
     
     return workflow.compile(checkpointer=checkpointer)
 
+def _message_text(content) -> str:
+    """Return the text of a message content that may be a list of parts."""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(
+            part if isinstance(part, str) else part.get("text", "")
+            for part in content
+            if isinstance(part, (str, dict))
+        )
+    return ""
+
+def cached_answer_steps(agent, query: str, config: dict):
+    state = yield Step(agent.get_state, agent.aget_state, config)
+    if state.values.get("messages"):
+        return None
+    content = yield Step.blocking(app_context.response_cache.get, query, app_context.retriever.index_version)
+    if content is None:
+        return None
+    tracer.log_step("INFO", "Serving first-turn answer from the response cache")
+    yield Step(agent.update_state, agent.aupdate_state, config, {"messages": [
+        {"role": "user", "content": query},
+        {"role": "assistant", "content": content}
+    ]}, as_node="agent")
+    return content
+
+def cached_answer(agent, query: str, config: dict):
+    """Answer a thread's first question from the response cache, if possible.
+
+    On a hit the question and cached answer are recorded in the thread, so
+    follow-up questions see the same history as after a full run.
+    """
+    return run_steps(cached_answer_steps(agent, query, config))
+
+async def acached_answer(agent, query: str, config: dict):
+    """Async cached_answer; the cache lookup runs on a worker thread."""
+    return await arun_steps(cached_answer_steps(agent, query, config))
+
+def remember_answer(query: str, messages: list, content: str):
+    """Cache the answer when it completed the thread's first turn."""
+    user_turns = sum(1 for msg in messages if isinstance(msg, dict) and msg.get("role") == "user")
+    if user_turns == 1:
+        app_context.response_cache.put(query, app_context.retriever.index_version, content)
+
+async def aremember_answer(query: str, messages: list, content: str):
+    await asyncio.to_thread(remember_answer, query, messages, content)
+
+def stream_agent(agent, query: str, thread_id: str, trace_id: str = None):
+    """Run one user turn, yielding node-progress, answer-token and final-answer events."""
+    with tracer.trace("query.stream", trace_id=trace_id, thread_id=thread_id):
+        tracer.log_step("USER", "Received query", {"query_chars": len(query)})
+        yield from _stream_turn(agent, query, thread_id)
+
+def _stream_turn(agent, query: str, thread_id: str):
+    config = {"configurable": {"thread_id": thread_id}}
+    cached = cached_answer(agent, query, config)
+    if cached is not None:
+        yield {"type": "final", "content": cached, "cached": True}
+        return
+    
+    initial_state = {
+        "messages": [{
+            "role": "user",
+            "content": query
+        }]
+    }
+    
+    final_content = ""
+    for mode, chunk in agent.stream(initial_state, config, stream_mode=STREAM_MODES):
+        event, content = stream_event(mode, chunk)
+        if event is not None:
+            yield event
+        if content is not None:
+            final_content = content
+    
+    remember_answer(query, agent.get_state(config).values.get("messages", []), final_content)
+    yield {"type": "final", "content": final_content}
+
+async def astream_agent(agent, query: str, thread_id: str, trace_id: str = None):
+    """Async stream_agent, driving the graph with astream."""
+    with tracer.trace("query.stream", trace_id=trace_id, thread_id=thread_id):
+        tracer.log_step("USER", "Received query", {"query_chars": len(query)})
+        config = {"configurable": {"thread_id": thread_id}}
+        cached = await acached_answer(agent, query, config)
+        if cached is not None:
+            yield {"type": "final", "content": cached, "cached": True}
+            return
+        
+        final_content = ""
+        initial_state = {"messages": [{"role": "user", "content": query}]}
+        async for mode, chunk in agent.astream(initial_state, config, stream_mode=STREAM_MODES):
+            event, content = stream_event(mode, chunk)
+            if event is not None:
+                yield event
+            if content is not None:
+                final_content = content
+        
+        state = await agent.aget_state(config)
+        await aremember_answer(query, state.values.get("messages", []), final_content)
+        yield {"type": "final", "content": final_content}
+
+def stream_event(mode: str, chunk):
+    """Turn one graph stream chunk into (client event or None, final answer or None)."""
+    if mode == "tasks":
+        if "input" in chunk:
+            return {"type": "node", "node": chunk["name"]}, None
+    elif mode == "messages":
+        message, metadata = chunk
+        if metadata.get("langgraph_node") != "agent":
+            return None, None
+        if not isinstance(message, (AIMessage, AIMessageChunk)):
+            return None, None
+        if getattr(message, "tool_call_chunks", None) or getattr(message, "tool_calls", None):
+            return None, None
+        text = _message_text(message.content)
+        if text:
+            return {"type": "token", "content": text}, None
+    else:
+        final_content = None
+        for node, update in chunk.items():
+            for msg in (update or {}).get("messages", []):
+                if isinstance(msg, dict) and msg.get("role") == "assistant" and not msg.get("tool_calls"):
+                    content = _message_text(msg.get("content", ""))
+                    if content.strip():
+                        final_content = content
+        return None, final_content
+    return None, None
+
 def run_agent_with_tracing(query: str):
     """Run the agent with enhanced tracing"""
-    tracer.log_step("USER", "Starting new conversation", {"query": query})
-    
     agent = get_agent()
     
     config = {"configurable": {"thread_id": "default_session"}}
@@ -603,9 +845,12 @@ def run_agent_with_tracing(query: str):
         "rag_context": ""
     }
     
-    result = agent.invoke(initial_state, config)
+    with tracer.trace("query", thread_id="default_session") as trace:
+        tracer.log_step("USER", "Starting new conversation", {"query_chars": len(query)})
+        result = agent.invoke(initial_state, config)
+    print(json.dumps(trace.to_dict(), indent=2, default=str))
     
-    tracer.log_summary(result["messages"])
+    log_summary(result["messages"])
     
     return result
 
@@ -0,0 +1,108 @@
+from collections import OrderedDict
+from tools.embedding_cache import normalize_query
+import numpy as np
+import threading
+import time
+
+RESPONSE_CACHE_MAX_ENTRIES = 512
+RESPONSE_CACHE_TTL_SECONDS = 3600
+
+
+def normalize_question(text: str) -> str:
+    """Normalize a question so casing, spacing and trailing punctuation don't matter."""
+    return normalize_query(text).rstrip(" ?!.")
+
+
+class ResponseCache:
+    """Cache of final answers to first-turn questions.
+
+    Entries are keyed by the normalized question and tied to an index version;
+    when the version changes (index rebuilt or synced) every older entry is
+    dropped. With embeddings and a similarity_threshold, a question that
+    misses exactly can still match a cached question whose embedding has at
+    least that cosine similarity.
+    """
+
+    def __init__(self, embeddings=None, similarity_threshold: float = None,
+                 max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+                 ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS):
+        self.embeddings = embeddings if similarity_threshold else None
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def _set_version(self, version: str):
+        if version != self.version:
+            if self._entries:
+                print(f"Response cache invalidated ({len(self._entries)} entries) for index version {version}")
+            self._entries.clear()
+            self.version = version
+
+    def _embed(self, question: str):
+        vector = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get(self, question: str, version: str):
+        key = normalize_question(question)
+        now = time.time()
+        with self._lock:
+            self._set_version(version)
+            for stale in [k for k, entry in self._entries.items() if now - entry["created"] > self.ttl_seconds]:
+                del self._entries[stale]
+
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry["response"]
+            candidates = [(k, entry) for k, entry in self._entries.items() if entry["vector"] is not None]
+            if self.embeddings is None or not candidates:
+                self.misses += 1
+                return None
+
+        query_vector = self._embed(key)
+        scores = np.stack([entry["vector"] for _, entry in candidates]) @ query_vector
+        best = int(np.argmax(scores))
+        if scores[best] >= self.similarity_threshold:
+            with self._lock:
+                self.semantic_hits += 1
+            print(f"Response cache: '{key}' matched '{candidates[best][0]}' ({scores[best]:.3f})")
+            return candidates[best][1]["response"]
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, question: str, version: str, response: str):
+        if not response or not response.strip():
+            return
+        key = normalize_question(question)
+        vector = self._embed(key) if self.embeddings is not None else None
+        with self._lock:
+            self._set_version(version)
+            self._entries[key] = {"response": response, "vector": vector, "created": time.time()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, hits, semantic_hits, misses = len(self._entries), self.hits, self.semantic_hits, self.misses
+        lookups = hits + semantic_hits + misses
+        return {
+            "entries": entries,
+            "hits": hits,
+            "semantic_hits": semantic_hits,
+            "misses": misses,
+            "hit_rate": (hits + semantic_hits) / lookups if lookups else 0.0
+        }
@@ -0,0 +1,68 @@
+import asyncio
+import functools
+from langchain_core.tools import StructuredTool
+
+
+class Step:
+    """One blocking operation of a shared implementation: fn(*args, **kwargs)
+    when run synchronously, await afn(*args, **kwargs) on the event loop."""
+    __slots__ = ("fn", "afn", "args", "kwargs")
+
+    def __init__(self, fn, afn, *args, **kwargs):
+        self.fn = fn
+        self.afn = afn
+        self.args = args
+        self.kwargs = kwargs
+
+    @classmethod
+    def blocking(cls, fn, *args, **kwargs):
+        """Step for a function with no async form; on the event loop it runs on a worker thread."""
+        return cls(fn, functools.partial(asyncio.to_thread, fn), *args, **kwargs)
+
+
+def run_steps(steps):
+    """Drive a generator of Steps synchronously and return its result.
+
+    Each yielded Step's sync function is called and its result (or
+    exception) is sent back into the generator.
+    """
+    value, error = None, None
+    while True:
+        try:
+            step = steps.throw(error) if error is not None else steps.send(value)
+        except StopIteration as done:
+            return done.value
+        try:
+            value, error = step.fn(*step.args, **step.kwargs), None
+        except Exception as e:
+            value, error = None, e
+
+
+async def arun_steps(steps):
+    """Async run_steps(): awaits each Step's async function instead."""
+    value, error = None, None
+    while True:
+        try:
+            step = steps.throw(error) if error is not None else steps.send(value)
+        except StopIteration as done:
+            return done.value
+        try:
+            value, error = await step.afn(*step.args, **step.kwargs), None
+        except Exception as e:
+            value, error = None, e
+
+
+def step_tool(steps_fn):
+    """Tool whose sync and async implementations both run the steps_fn generator.
+
+    Name, description and argument schema come from steps_fn, as with @tool.
+    """
+    @functools.wraps(steps_fn)
+    def func(*args, **kwargs):
+        return run_steps(steps_fn(*args, **kwargs))
+
+    @functools.wraps(steps_fn)
+    async def coroutine(*args, **kwargs):
+        return await arun_steps(steps_fn(*args, **kwargs))
+
+    return StructuredTool.from_function(func=func, coroutine=coroutine)
@@ -0,0 +1,351 @@
+from collections import OrderedDict
+from datetime import datetime, timezone
+import atexit
+import contextvars
+import functools
+import hashlib
+import hmac
+import inspect
+import itertools
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+
+LEVELS = {"debug": 10, "info": 20, "error": 40, "off": 100}
+
+# Event types logged by the agent, mapped to the level that enables them.
+STEP_LEVELS = {
+    "ERROR": LEVELS["error"],
+    "USER": LEVELS["info"],
+    "AGENT": LEVELS["info"],
+    "TOOL": LEVELS["info"],
+    "RAG": LEVELS["info"],
+    "INFO": LEVELS["debug"],
+    "DECISION": LEVELS["debug"],
+    "FLOW": LEVELS["debug"],
+}
+
+TRACE_LEVEL = os.getenv("TRACE_LEVEL", "info").lower()
+TRACE_EXPORT = os.getenv("TRACE_EXPORT")
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "100"))
+# The /traces endpoints are off unless this token is set; requests then need
+# "Authorization: Bearer <token>".
+TRACE_ADMIN_TOKEN = os.getenv("TRACE_ADMIN_TOKEN")
+TRACE_EXPORT_QUEUE_SIZE = 10000
+TRACE_MAX_VALUE_CHARS = 200
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def thread_ref(thread_id: str) -> str:
+    """Short one-way reference to a thread ID.
+
+    The thread ID is the client's only session credential, so traces record
+    this instead of the ID itself.
+    """
+    return hashlib.sha256(str(thread_id).encode()).hexdigest()[:16]
+
+
+def trace_access_allowed(authorization: str) -> bool:
+    """Whether an Authorization header value grants access to stored traces."""
+    if not TRACE_ADMIN_TOKEN:
+        return False
+    return hmac.compare_digest((authorization or "").encode(), f"Bearer {TRACE_ADMIN_TOKEN}".encode())
+
+
+def _clip(value):
+    if isinstance(value, str) and len(value) > TRACE_MAX_VALUE_CHARS:
+        return value[:TRACE_MAX_VALUE_CHARS] + "..."
+    return value
+
+
+def _clip_data(data):
+    if isinstance(data, dict):
+        return {key: _clip(value) for key, value in data.items()}
+    return _clip(data)
+
+
+class JsonlExporter:
+    """Writes records as JSON lines from a background thread.
+
+    export() only enqueues, so request threads never wait on I/O; when the
+    queue is full the record is dropped and counted. path "-" writes to stdout.
+    """
+
+    def __init__(self, path: str, max_queue: int = TRACE_EXPORT_QUEUE_SIZE):
+        self.path = path
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def export(self, record: dict):
+        if self._thread is None or not self._thread.is_alive():
+            self._start()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        if self.path == "-":
+            stream = sys.stdout
+        else:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            stream = open(self.path, "a", encoding="utf-8")
+        while True:
+            records = [self._queue.get()]
+            while True:
+                try:
+                    records.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in records
+            lines = [json.dumps(record, default=str) for record in records if record is not None]
+            if lines:
+                stream.write("\n".join(lines) + "\n")
+                stream.flush()
+            if stop:
+                if stream is not sys.stdout:
+                    stream.close()
+                return
+
+    def close(self, timeout: float = 2.0):
+        """Flush queued records and stop the writer thread."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+
+class Trace:
+    """Spans and events recorded for one request."""
+
+    def __init__(self, name: str, trace_id: str = None, attributes: dict = None):
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.name = name
+        self.attributes = attributes or {}
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.start = time.monotonic()
+        self.duration_ms = None
+        self.status = "ok"
+        self.spans = []
+        self.events = []
+        self._span_ids = itertools.count(1)
+
+    def elapsed_ms(self) -> float:
+        return round((time.monotonic() - self.start) * 1000, 3)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "attributes": self.attributes,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "spans": list(self.spans),
+            "events": list(self.events),
+        }
+
+    def summary(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "attributes": self.attributes,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "spans": len(self.spans),
+        }
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    def __init__(self, trace: Trace, name: str, attributes: dict):
+        self.trace = trace
+        self.record = {
+            "span_id": next(trace._span_ids),
+            "parent_id": _current_span.get(),
+            "name": name,
+            "attributes": attributes,
+        }
+
+    def __enter__(self):
+        self._start = time.monotonic()
+        self.record["start_ms"] = round((self._start - self.trace.start) * 1000, 3)
+        self._token = _current_span.set(self.record["span_id"])
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.record["duration_ms"] = round((time.monotonic() - self._start) * 1000, 3)
+        self.record["status"] = "error" if exc_type else "ok"
+        if exc is not None:
+            self.record["error"] = repr(exc)
+        _current_span.reset(self._token)
+        self.trace.spans.append(self.record)
+        return False
+
+
+class _TraceScope:
+    def __init__(self, tracer, trace: Trace):
+        self.tracer = tracer
+        self.trace = trace
+
+    def __enter__(self):
+        self._tokens = (_current_trace.set(self.trace), _current_span.set(None))
+        return self.trace
+
+    def __exit__(self, exc_type, exc, tb):
+        self.trace.duration_ms = self.trace.elapsed_ms()
+        if exc_type:
+            self.trace.status = "error"
+            self.trace.attributes["error"] = repr(exc)
+        for var, token in zip((_current_trace, _current_span), self._tokens):
+            try:
+                var.reset(token)
+            except ValueError:
+                # Generators can be resumed in a different context than they started in.
+                var.set(None)
+        self.tracer._finish(self.trace)
+        return False
+
+
+class Tracer:
+    """Span-based request tracer with per-request state held in contextvars.
+
+    trace() opens a request, span() times a unit of work inside it (nested
+    spans record their parent), and log_step() attaches an event to the
+    current span. Everything is gated by level: below it, calls return
+    immediately and nothing is recorded. Finished traces are kept in a small
+    in-memory buffer for get_trace() and sent to the exporter, if any.
+    """
+
+    def __init__(self, level: str = TRACE_LEVEL, exporter: JsonlExporter = None,
+                 buffer_size: int = TRACE_BUFFER_SIZE):
+        self.level = LEVELS.get(level, LEVELS["info"])
+        self.exporter = exporter
+        self.buffer_size = buffer_size
+        self._traces = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.level < LEVELS["off"]
+
+    def trace(self, name: str, trace_id: str = None, **attributes):
+        """Context manager recording one request; yields the Trace.
+
+        A thread_id attribute is stored as its thread_ref().
+        """
+        if "thread_id" in attributes:
+            attributes["thread_ref"] = thread_ref(attributes.pop("thread_id"))
+        return _TraceScope(self, Trace(name, trace_id, attributes))
+
+    def span(self, name: str, **attributes):
+        """Context manager timing a unit of work inside the current trace."""
+        trace = _current_trace.get()
+        if trace is None or not self.enabled:
+            return _NOOP_SPAN
+        return _Span(trace, name, attributes)
+
+    def traced(self, name: str):
+        """Decorator running the function (or coroutine function) inside a span."""
+        def decorator(fn):
+            if inspect.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(name):
+                        return await fn(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def log_step(self, step_type: str, description: str, data=None):
+        """Record an event on the current span, if its level is enabled."""
+        level = STEP_LEVELS.get(step_type, LEVELS["info"])
+        if level < self.level:
+            return
+        if level >= LEVELS["error"]:
+            print(f"[{step_type}] {description}")
+        trace = _current_trace.get()
+        event = {"span_id": _current_span.get(), "type": step_type, "message": description}
+        if data:
+            event["data"] = _clip_data(data)
+        if trace is not None:
+            event["t_ms"] = trace.elapsed_ms()
+            trace.events.append(event)
+        elif self.exporter is not None:
+            event["time"] = datetime.now(timezone.utc).isoformat()
+            self.exporter.export(event)
+
+    def log_flow_transition(self, from_node: str, to_node: str, condition: str = None):
+        if STEP_LEVELS["FLOW"] < self.level:
+            return
+        self.log_step("FLOW", f"{from_node} -> {to_node}", {"condition": condition} if condition else None)
+
+    def current_trace_id(self):
+        trace = _current_trace.get()
+        return trace.trace_id if trace is not None else None
+
+    def _finish(self, trace: Trace):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._traces[trace.trace_id] = trace
+            while len(self._traces) > self.buffer_size:
+                self._traces.popitem(last=False)
+        if self.exporter is not None:
+            self.exporter.export(trace.to_dict())
+
+    def get_trace(self, trace_id: str):
+        """Full record of a recent trace, or None if it is no longer buffered."""
+        with self._lock:
+            trace = self._traces.get(trace_id)
+        return trace.to_dict() if trace is not None else None
+
+    def recent_traces(self, **attributes) -> list:
+        """Summaries of buffered traces, newest first, optionally filtered by attribute values."""
+        with self._lock:
+            traces = list(self._traces.values())
+        return [
+            trace.summary() for trace in reversed(traces)
+            if all(trace.attributes.get(key) == value for key, value in attributes.items())
+        ]
+
+
+def create_tracer() -> Tracer:
+    """Build the process tracer from TRACE_LEVEL, TRACE_EXPORT and TRACE_BUFFER_SIZE."""
+    exporter = JsonlExporter(TRACE_EXPORT) if TRACE_EXPORT else None
+    return Tracer(level=TRACE_LEVEL, exporter=exporter, buffer_size=TRACE_BUFFER_SIZE)
+
+
+tracer = create_tracer()
@@ -0,0 +1,184 @@
+# ASGI entry point: uvicorn asgi:app --host 0.0.0.0 --port 5000
+#
+# Serves the same API as main.py, but drives the graph with ainvoke/astream
+# on one event loop: a request waiting on Gemini holds no thread, so a single
+# process can keep hundreds of conversations in flight.
+from main import (
+    parse_query_request, find_response, no_response_payload, usage_debug,
+    sse_event, thread_usage_report, health_report, trace_filters
+)
+from agents.langgraph_agent import astream_agent, acached_answer, aremember_answer
+from agents.app_context import app_context
+from agents.tracing import tracer, trace_access_allowed
+from tools.llm_gateway import track_usage
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+from contextlib import asynccontextmanager
+import asyncio
+import json
+import os
+import time
+import traceback
+import uuid
+
+MAX_BODY_BYTES = int(os.getenv("MAX_BODY_BYTES", str(64 * 1024)))
+
+
+async def read_json(request):
+    """Read and parse the request body, rejecting bodies over MAX_BODY_BYTES."""
+    body = b""
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > MAX_BODY_BYTES:
+            raise HTTPException(413, "Request body too large")
+    if not body:
+        return None
+    try:
+        return json.loads(body)
+    except ValueError:
+        raise HTTPException(400, "Request body is not valid JSON")
+
+
+async def load_agent():
+    """The compiled agent, loaded on a worker thread if warm-up has not finished."""
+    if app_context.ready:
+        return app_context.agent
+    return await asyncio.to_thread(lambda: app_context.agent)
+
+
+async def handle_query(request):
+    data = await read_json(request)
+    query, thread_id, error = parse_query_request(data)
+    if error:
+        return JSONResponse({"error": error}, 400)
+
+    config = {"configurable": {"thread_id": thread_id}}
+    agent = await load_agent()
+    debug = bool(data.get("debug")) or request.query_params.get("debug") == "1"
+    started = time.monotonic()
+
+    with tracer.trace("query", thread_id=thread_id) as trace, track_usage() as usage:
+        tracer.log_step("USER", "Received query", {"query_chars": len(query)})
+        cached = await acached_answer(agent, query, config)
+        if cached is None:
+            result = await agent.ainvoke({"messages": [{"role": "user", "content": query}]}, config)
+            tracer.log_step("INFO", f"Run finished with {len(result.get('messages', []))} messages")
+
+    async def respond(payload: dict):
+        if debug:
+            thread_usage = (await agent.aget_state(config)).values.get("usage", {})
+            payload["debug"] = {**payload.get("debug", {}), **usage_debug(trace, started, usage, thread_usage)}
+        return JSONResponse(payload, headers={"X-Trace-Id": trace.trace_id})
+
+    if cached is not None:
+        return await respond({"response": cached, "thread_id": thread_id, "cached": True})
+
+    messages = result.get("messages", [])
+    content, is_answer = find_response(messages)
+    if content is not None:
+        if is_answer:
+            await aremember_answer(query, messages, content)
+        return await respond({"response": content, "thread_id": thread_id})
+    return await respond(no_response_payload(thread_id, messages))
+
+
+async def handle_query_stream(request):
+    """Stream node progress and answer tokens as Server-Sent Events; the run is cancelled if the client disconnects."""
+    query, thread_id, error = parse_query_request(await read_json(request))
+    if error:
+        return JSONResponse({"error": error}, 400)
+
+    agent = await load_agent()
+    trace_id = uuid.uuid4().hex
+
+    async def events():
+        yield sse_event({"type": "thread", "thread_id": thread_id})
+        try:
+            async for event in astream_agent(agent, query, thread_id, trace_id=trace_id):
+                yield sse_event(event)
+        except Exception as e:
+            print(f"Error in handle_query_stream: {str(e)}")
+            yield sse_event({"type": "error", "error": str(e)})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+        "X-Thread-Id": thread_id,
+        "X-Trace-Id": trace_id,
+    })
+
+
+async def list_traces(request):
+    """Summaries of recent request traces, newest first (filter with ?thread_id=)."""
+    if not trace_access_allowed(request.headers.get("authorization")):
+        raise HTTPException(404, "Not found")
+    filters = trace_filters(request.query_params.get("thread_id"))
+    return JSONResponse({"traces": tracer.recent_traces(**filters)})
+
+
+async def get_trace(request):
+    """Full span and event record of one recent request."""
+    if not trace_access_allowed(request.headers.get("authorization")):
+        raise HTTPException(404, "Not found")
+    trace = tracer.get_trace(request.path_params["trace_id"])
+    if trace is None:
+        raise HTTPException(404, "Trace not found")
+    return JSONResponse(trace)
+
+
+async def thread_usage(request):
+    """LLM and embedding usage accumulated over every turn of a conversation."""
+    if not app_context.ready:
+        raise HTTPException(503, "Agent is not loaded yet")
+    thread_id = request.path_params["thread_id"]
+    state = await app_context.agent.aget_state({"configurable": {"thread_id": thread_id}})
+    report = thread_usage_report(thread_id, state.values)
+    if report is None:
+        raise HTTPException(404, "Thread not found")
+    return JSONResponse(report)
+
+
+async def health_check(request):
+    """Report readiness without triggering a load; stats are included once the agent is ready."""
+    health, status = health_report(app_context.agent if app_context.ready else None)
+    return JSONResponse(health, status)
+
+
+async def http_error(request, exc):
+    return JSONResponse({"error": exc.detail}, exc.status_code, headers=exc.headers)
+
+
+async def server_error(request, exc):
+    print(f"Error in {request.url.path}: {str(exc)}")
+    traceback.print_exc()
+    return JSONResponse({"error": f"An error occurred: {str(exc)}"}, 500)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    app_context.warm_up(background=True)
+    yield
+
+
+app = Starlette(
+    routes=[
+        Route("/query", handle_query, methods=["POST"]),
+        Route("/query/stream", handle_query_stream, methods=["POST"]),
+        Route("/traces", list_traces, methods=["GET"]),
+        Route("/traces/{trace_id}", get_trace, methods=["GET"]),
+        Route("/threads/{thread_id}/usage", thread_usage, methods=["GET"]),
+        Route("/health", health_check, methods=["GET"]),
+    ],
+    exception_handlers={HTTPException: http_error, Exception: server_error},
+    lifespan=lifespan,
+)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    if not os.getenv("GOOGLE_API_KEY"):
+        print("Warning: GOOGLE_API_KEY not found in environment variables")
+    uvicorn.run("asgi:app", host="0.0.0.0", port=5000)
@@ -0,0 +1,34 @@
+# Representative multi-turn conversations, one list of user messages each.
+# Together they exercise every tool, follow-up turns with history and
+# hybrid retrieval with exact-term queries.
+CONVERSATIONS = {
+    "location": [
+        "What jobs are available in Cairo?",
+        "Which of those are hybrid?",
+    ],
+    "browse": [
+        "List all open positions",
+        "Tell me more about the Product Owner role",
+        "What are the requirements for the Scrum Master position?",
+    ],
+    "compare": [
+        "Compare Product Owner vs Scrum Master",
+    ],
+    "career": [
+        "What does career growth look like for a Quality Assurance Specialist?",
+    ],
+    "keywords": [
+        "Any roles that need Oracle SCM or SAP experience?",
+        "Is there anything in marketing?",
+    ],
+}
+
+# Queries timed directly against JobRetriever.
+RETRIEVER_QUERIES = [
+    "maintenance engineer",
+    "quality assurance GMP",
+    "Oracle SCM",
+    "digital marketing in Cairo",
+    "sales representative Saudi Arabia",
+    "employee experience and internal communication",
+]
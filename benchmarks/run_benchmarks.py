@@ -0,0 +1,332 @@
+"""Offline latency benchmarks for the agent graph, the /query endpoint, the async path and the retriever.
+
+Runs with the deterministic fake Gemini clients (LLM_BACKEND=fake) in a
+temporary copy of the data directory, so no network access is needed and the
+real vector index is never touched. Run from the repository root:
+
+    python -m benchmarks.run_benchmarks --iterations 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentiles(values) -> dict:
+    if not values:
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": len(values),
+        "mean_ms": round(float(np.mean(values)), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+    }
+
+
+def prepare_workspace(jobs_path: str) -> str:
+    """Copy the job data into a temporary directory and make it the working directory."""
+    workspace = tempfile.mkdtemp(prefix="eva-bench-")
+    os.makedirs(os.path.join(workspace, "data"))
+    shutil.copy(jobs_path, os.path.join(workspace, "data", "jobs.json"))
+    os.chdir(workspace)
+    return workspace
+
+
+def graph_steps(agent, config) -> int:
+    metadata = agent.get_state(config).metadata or {}
+    return metadata.get("step", -1)
+
+
+def llm_calls(gateway) -> dict:
+    return {operation: stats["calls"] for operation, stats in gateway.stats().items()}
+
+
+def calls_per_turn(before: dict, after: dict, turns: int) -> dict:
+    return {
+        operation: round((calls - before.get(operation, 0)) / turns, 2)
+        for operation, calls in after.items() if calls - before.get(operation, 0)
+    }
+
+
+class Recorder:
+    """Collects per-turn latency, graph steps and span durations for one target."""
+
+    def __init__(self):
+        self.latencies = []
+        self.steps = []
+        self.spans = {}
+
+    def add(self, latency_ms: float, steps: int, trace=None):
+        self.latencies.append(latency_ms)
+        self.steps.append(steps)
+        for span in (trace.spans if trace is not None else []):
+            self.spans.setdefault(span["name"], []).append(span["duration_ms"])
+
+    def report(self) -> dict:
+        return {
+            **percentiles(self.latencies),
+            "graph_steps_per_turn": round(float(np.mean(self.steps)), 2) if self.steps else 0,
+            "spans": {name: percentiles(durations) for name, durations in sorted(self.spans.items())},
+        }
+
+
+def run_graph_turn(agent, tracer, conversations, thread_prefix: str, recorder: Recorder = None, on_turn=None):
+    for name, turns in conversations.items():
+        config = {"configurable": {"thread_id": f"{thread_prefix}-{name}"}}
+        for query in turns:
+            steps_before = graph_steps(agent, config)
+            started = time.perf_counter()
+            with tracer.trace("benchmark", thread_id=config["configurable"]["thread_id"]) as trace:
+                agent.invoke({"messages": [{"role": "user", "content": query}]}, config)
+            elapsed = (time.perf_counter() - started) * 1000
+            if recorder is not None:
+                recorder.add(elapsed, graph_steps(agent, config) - steps_before, trace)
+            if on_turn is not None:
+                on_turn()
+
+
+def bench_graph(app_context, tracer, gateway, conversations, iterations: int) -> dict:
+    agent = app_context.agent
+    recorder = Recorder()
+    before = llm_calls(gateway)
+    for iteration in range(iterations):
+        run_graph_turn(agent, tracer, conversations, f"bench-graph-{iteration}", recorder)
+    report = recorder.report()
+    report["llm_calls_per_turn"] = calls_per_turn(before, llm_calls(gateway), len(recorder.latencies))
+    return report
+
+
+def bench_api(app, app_context, gateway, conversations, iterations: int, keep_response_cache: bool) -> dict:
+    client = app.test_client()
+    agent = app_context.agent
+    recorder = Recorder()
+    before = llm_calls(gateway)
+    cached = 0
+    for iteration in range(iterations):
+        if not keep_response_cache:
+            app_context.response_cache.clear()
+        for name, turns in conversations.items():
+            thread_id = f"bench-api-{iteration}-{name}"
+            config = {"configurable": {"thread_id": thread_id}}
+            for query in turns:
+                steps_before = graph_steps(agent, config)
+                started = time.perf_counter()
+                response = client.post("/query", json={"query": query, "thread_id": thread_id})
+                elapsed = (time.perf_counter() - started) * 1000
+                if response.status_code != 200 or "response" not in response.json:
+                    raise RuntimeError(f"/query failed for {query!r}: {response.get_data(as_text=True)}")
+                cached += bool(response.json.get("cached"))
+                recorder.add(elapsed, graph_steps(agent, config) - steps_before)
+    report = recorder.report()
+    report["cached_turns"] = cached
+    report["llm_calls_per_turn"] = calls_per_turn(before, llm_calls(gateway), len(recorder.latencies))
+    return report
+
+
+def bench_concurrency(app_context, tracer, gateway, conversations, concurrency: int) -> dict:
+    """Replay `concurrency` conversations at once on one event loop with ainvoke."""
+    agent = app_context.agent
+    names = list(conversations)
+    latencies = []
+
+    async def conversation(index: int):
+        name = names[index % len(names)]
+        config = {"configurable": {"thread_id": f"bench-concurrency-{index}-{name}"}}
+        for query in conversations[name]:
+            started = time.perf_counter()
+            with tracer.trace("benchmark", thread_id=config["configurable"]["thread_id"]):
+                await agent.ainvoke({"messages": [{"role": "user", "content": query}]}, config)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    async def run_all():
+        await asyncio.gather(*(conversation(index) for index in range(concurrency)))
+
+    before = llm_calls(gateway)
+    started = time.perf_counter()
+    asyncio.run(run_all())
+    elapsed = time.perf_counter() - started
+    return {
+        **percentiles(latencies),
+        "conversations": concurrency,
+        "wall_seconds": round(elapsed, 3),
+        "turns_per_second": round(len(latencies) / elapsed, 2),
+        "llm_calls_per_turn": calls_per_turn(before, llm_calls(gateway), len(latencies)),
+    }
+
+
+def bench_retriever(retriever, queries, iterations: int) -> dict:
+    single, batched = [], []
+    for _ in range(iterations):
+        for query in queries:
+            started = time.perf_counter()
+            retriever.retrieve(query, k=5)
+            single.append((time.perf_counter() - started) * 1000)
+        started = time.perf_counter()
+        retriever.retrieve_many(queries, k=5)
+        batched.append((time.perf_counter() - started) * 1000)
+    return {"retrieve": percentiles(single), f"retrieve_many[{len(queries)}]": percentiles(batched)}
+
+
+def bench_allocations(app_context, tracer, conversations) -> dict:
+    """Peak and retained Python allocations per graph turn, measured in a separate pass."""
+    peaks, retained = [], []
+    tracemalloc.start()
+    baseline = [tracemalloc.get_traced_memory()[0]]
+
+    def on_turn():
+        current, peak = tracemalloc.get_traced_memory()
+        peaks.append((peak - baseline[0]) / 1024)
+        retained.append((current - baseline[0]) / 1024)
+        tracemalloc.reset_peak()
+        baseline[0] = tracemalloc.get_traced_memory()[0]
+
+    try:
+        run_graph_turn(app_context.agent, tracer, conversations, "bench-alloc", on_turn=on_turn)
+    finally:
+        tracemalloc.stop()
+    return {
+        "turns": len(peaks),
+        "peak_kib_per_turn": {"mean": round(float(np.mean(peaks)), 1), "max": round(float(np.max(peaks)), 1)},
+        "retained_kib_per_turn": {"mean": round(float(np.mean(retained)), 1), "max": round(float(np.max(retained)), 1)},
+    }
+
+
+def print_report(results: dict):
+    print(f"\nStartup: {results['startup_seconds']}s (index build with fake embeddings included)")
+    for target in ("graph", "api"):
+        if target not in results:
+            continue
+        report = results[target]
+        print(f"\n[{target}] {report['count']} turns: p50 {report['p50_ms']}ms  p95 {report['p95_ms']}ms  "
+              f"p99 {report['p99_ms']}ms  mean {report['mean_ms']}ms  steps/turn {report['graph_steps_per_turn']}")
+        print(f"  LLM calls/turn: {report['llm_calls_per_turn']}")
+        if "cached_turns" in report:
+            print(f"  Turns served from the response cache: {report['cached_turns']}")
+        for name, stats in report["spans"].items():
+            print(f"  {name:<32} n={stats['count']:<5} p50 {stats['p50_ms']}ms  p95 {stats['p95_ms']}ms")
+    if "concurrency" in results:
+        report = results["concurrency"]
+        print(f"\n[concurrency] {report['conversations']} conversations, {report['count']} turns in "
+              f"{report['wall_seconds']}s ({report['turns_per_second']} turns/s): p50 {report['p50_ms']}ms  "
+              f"p95 {report['p95_ms']}ms  p99 {report['p99_ms']}ms")
+    if "retriever" in results:
+        print("\n[retriever]")
+        for name, stats in results["retriever"].items():
+            print(f"  {name:<32} n={stats['count']:<5} p50 {stats['p50_ms']}ms  p95 {stats['p95_ms']}ms  p99 {stats['p99_ms']}ms")
+    if "allocations" in results:
+        allocations = results["allocations"]
+        print(f"\n[allocations] {allocations['turns']} turns: peak {allocations['peak_kib_per_turn']} KiB, "
+              f"retained {allocations['retained_kib_per_turn']} KiB")
+
+
+def compare_to_baseline(results: dict, baseline: dict, max_regression: float) -> list:
+    """p95 latencies that grew by more than max_regression (a fraction) over the baseline."""
+    regressions = []
+    pairs = [(target, results.get(target), baseline.get(target)) for target in ("graph", "api", "concurrency")]
+    pairs += [(f"retriever.{name}", stats, baseline.get("retriever", {}).get(name))
+              for name, stats in results.get("retriever", {}).items()]
+    for name, current, previous in pairs:
+        if not current or not previous or not previous.get("p95_ms"):
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + max_regression):
+            regressions.append(f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks with deterministic fake Gemini clients.")
+    parser.add_argument("--targets", default="graph,api,concurrency,retriever,allocations",
+                        help="comma-separated subset of graph, api, concurrency, retriever, allocations")
+    parser.add_argument("--iterations", type=int, default=10, help="times each conversation is replayed")
+    parser.add_argument("--warmup", type=int, default=1, help="unmeasured iterations run first")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="simulated latency per chat/generate call")
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0, help="simulated latency per embedding call")
+    parser.add_argument("--concurrency", type=int, default=100,
+                        help="conversations run at once by the concurrency target")
+    parser.add_argument("--checkpointer", choices=["sqlite", "memory"], default="sqlite")
+    parser.add_argument("--keep-response-cache", action="store_true",
+                        help="let /query answer repeated first turns from the response cache")
+    parser.add_argument("--jobs", default=os.path.join(REPO_ROOT, "data", "jobs.json"), help="job data to index")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="earlier --json results to compare p95 latencies against")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="allowed p95 growth over the baseline before exiting with status 1")
+    args = parser.parse_args()
+    targets = {target.strip() for target in args.targets.split(",") if target.strip()}
+
+    # Configuration is read at import time, so it is set before importing the app.
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["LLM_FAKE_LATENCY_MS"] = str(args.llm_latency_ms)
+    os.environ["LLM_FAKE_EMBED_LATENCY_MS"] = str(args.embed_latency_ms)
+    os.environ["CHECKPOINTER"] = args.checkpointer
+    os.environ.setdefault("TRACE_LEVEL", "info")
+    jobs_path = os.path.abspath(args.jobs)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    output_path = os.path.abspath(args.json) if args.json else None
+    sys.path.insert(0, REPO_ROOT)
+    workspace = prepare_workspace(jobs_path)
+
+    try:
+        import main as api
+        from agents.app_context import app_context
+        from agents.tracing import tracer
+        from tools.llm_gateway import gateway
+        from benchmarks.conversations import CONVERSATIONS, RETRIEVER_QUERIES
+
+        started = time.perf_counter()
+        app_context.warm_up()
+        if not app_context.ready:
+            raise RuntimeError(f"Application failed to load: {app_context.error}")
+        results = {
+            "startup_seconds": round(time.perf_counter() - started, 3),
+            "config": {key: value for key, value in vars(args).items() if key not in ("json", "baseline")},
+        }
+
+        for iteration in range(args.warmup):
+            run_graph_turn(app_context.agent, tracer, CONVERSATIONS, f"bench-warmup-{iteration}")
+
+        if "graph" in targets:
+            results["graph"] = bench_graph(app_context, tracer, gateway, CONVERSATIONS, args.iterations)
+        if "api" in targets:
+            results["api"] = bench_api(api.app, app_context, gateway, CONVERSATIONS, args.iterations,
+                                       args.keep_response_cache)
+        if "concurrency" in targets:
+            results["concurrency"] = bench_concurrency(app_context, tracer, gateway, CONVERSATIONS, args.concurrency)
+        if "retriever" in targets:
+            results["retriever"] = bench_retriever(app_context.retriever, RETRIEVER_QUERIES, args.iterations)
+        if "allocations" in targets:
+            results["allocations"] = bench_allocations(app_context, tracer, CONVERSATIONS)
+    finally:
+        os.chdir(REPO_ROOT)
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    print_report(results)
+    if output_path:
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {output_path}")
+    if baseline is not None:
+        regressions = compare_to_baseline(results, baseline, args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"\nNo p95 regressions beyond {args.max_regression:.0%} of the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+# Gunicorn settings: gunicorn -c gunicorn.conf.py main:app
+#
+# The master imports main, loads the job index and agent once, then forks the
+# workers, which share the loaded data through copy-on-write. Each worker
+# reopens its own database connections and API clients after the fork.
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:5000")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+preload_app = True
+
+
+def on_starting(server):
+    from agents.app_context import app_context
+
+    app_context.warm_up()
+
+
+def post_fork(server, worker):
+    from agents.app_context import app_context
+
+    app_context.reopen_after_fork()
@@ -3,14 +3,107 @@ import sys
 sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
 import re
 import os
-from flask import Flask, request, jsonify
-from agents.langgraph_agent import get_agent
+import json
+import time
+import uuid
+from flask import Flask, request, jsonify, Response, stream_with_context, g
+from agents.langgraph_agent import stream_agent, cached_answer, remember_answer
+from agents.app_context import app_context
+from agents.tracing import tracer, thread_ref, trace_access_allowed
+from tools.llm_gateway import gateway, track_usage
 from dotenv import load_dotenv
 
 load_dotenv()
 app = Flask(__name__)
 
-agent = get_agent()
+MAX_THREAD_ID_LENGTH = 128
+
+def resolve_thread_id(data: dict):
+    """Return the client's thread ID, issuing a new one when none is given."""
+    thread_id = data.get('thread_id')
+    if thread_id is None:
+        return str(uuid.uuid4())
+    if not isinstance(thread_id, str) or not thread_id.strip() or len(thread_id) > MAX_THREAD_ID_LENGTH:
+        return None
+    return thread_id.strip()
+
+def parse_query_request(data):
+    """Validate a /query body; returns (query, thread_id, error message)."""
+    if not data:
+        return None, None, "No JSON data provided"
+    if not isinstance(data, dict):
+        return None, None, "Request body must be a JSON object"
+    query = data.get('query', '')
+    if not query:
+        return None, None, "No query provided"
+    if not isinstance(query, str):
+        return None, None, "query must be a string"
+    thread_id = resolve_thread_id(data)
+    if thread_id is None:
+        return None, None, f"thread_id must be a non-empty string of at most {MAX_THREAD_ID_LENGTH} characters"
+    return query, thread_id, None
+
+def find_response(messages: list):
+    """Pick the answer from a finished run; returns (content, is_assistant_answer)."""
+    for msg in reversed(messages):
+        if isinstance(msg, dict) and msg.get("role") == "assistant":
+            content = msg.get("content", "")
+            if content and content.strip():
+                return content, True
+    for msg in reversed(messages):
+        if isinstance(msg, dict):
+            content = msg.get("content", "")
+            if content and content.strip() and msg.get("role") != "user":
+                return content, False
+    return None, False
+
+def no_response_payload(thread_id: str, messages: list) -> dict:
+    return {
+        "error": "No response generated",
+        "thread_id": thread_id,
+        "debug": {
+            "total_messages": len(messages),
+            "message_roles": [msg.get("role", "unknown") if isinstance(msg, dict) else type(msg).__name__ for msg in messages],
+            "last_message": messages[-1] if messages else None
+        }
+    }
+
+def usage_debug(trace, started: float, usage, thread_usage: dict) -> dict:
+    """Debug block returned when a client asks for a request's usage."""
+    return {
+        "trace_id": trace.trace_id,
+        "latency_seconds": round(time.monotonic() - started, 4),
+        "usage": usage.summary(),
+        "thread_usage": thread_usage
+    }
+
+def trace_filters(thread_id: str = None) -> dict:
+    """recent_traces() filters for an optional ?thread_id= query parameter."""
+    return {"thread_ref": thread_ref(thread_id)} if thread_id else {}
+
+def sse_event(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+def thread_usage_report(thread_id: str, values: dict):
+    """Usage payload for a thread's checkpointed state, or None for an unknown thread."""
+    if not values.get("messages"):
+        return None
+    turns = sum(1 for msg in values["messages"] if isinstance(msg, dict) and msg.get("role") == "user")
+    return {"thread_id": thread_id, "turns": turns, "usage": values.get("usage", {})}
+
+def health_report(agent=None):
+    """Readiness payload and status code; agent stats are included once it is loaded."""
+    status = app_context.status()
+    if status["state"] == "failed":
+        return {"status": "unhealthy", **status}, 503
+    health = {"status": "healthy", **status}
+    if agent is not None:
+        if hasattr(agent.checkpointer, "stats"):
+            health["checkpointer"] = agent.checkpointer.stats()
+        health["response_cache"] = app_context.response_cache.stats()
+        health["embedding_cache"] = app_context.retriever.embedding_model.stats()
+    health["llm"] = gateway.stats()
+    return health, 200
 
 def prettify_text_for_postman(content: str) -> str:
     """
@@ -30,12 +123,9 @@ def prettify_text_for_postman(content: str) -> str:
 def handle_query():
     try:
         data = request.json
-        if not data:
-            return jsonify({"error": "No JSON data provided"}), 400
-            
-        query = data.get('query', '')
-        if not query:
-            return jsonify({"error": "No query provided"}), 400
+        query, thread_id, error = parse_query_request(data)
+        if error:
+            return jsonify({"error": error}), 400
         
         initial_state = {
             "messages": [{
@@ -44,36 +134,39 @@ def handle_query():
             }]
         }
         
-        config = {"configurable": {"thread_id": "main_session"}}
+        config = {"configurable": {"thread_id": thread_id}}
+        agent = app_context.agent
+        debug = bool(data.get('debug')) or request.args.get('debug') == '1'
+        started = time.monotonic()
         
-        result = agent.invoke(initial_state, config)
-        messages = result.get("messages", [])
-
-        print("All messages:")
-        for i, msg in enumerate(messages):
-            print(f"Message {i}: {msg}")
+        with tracer.trace("query", thread_id=thread_id) as trace, track_usage() as usage:
+            g.trace_id = trace.trace_id
+            tracer.log_step("USER", "Received query", {"query_chars": len(query)})
+            cached = cached_answer(agent, query, config)
+            if cached is None:
+                result = agent.invoke(initial_state, config)
+                tracer.log_step("INFO", f"Run finished with {len(result.get('messages', []))} messages")
+        
+        def respond(payload: dict):
+            """Return the payload, adding the request's usage when debug was requested."""
+            if debug:
+                payload["debug"] = {
+                    **payload.get("debug", {}),
+                    **usage_debug(trace, started, usage, agent.get_state(config).values.get("usage", {}))
+                }
+            return jsonify(payload)
+        
+        if cached is not None:
+            return respond({"response": cached, "thread_id": thread_id, "cached": True})
         
-        if messages:
-            for msg in reversed(messages):
-                if isinstance(msg, dict) and msg.get("role") == "assistant":
-                    content = msg.get("content", "")
-                    if content and content.strip():
-                        return jsonify({"response": content})
-            
-            for msg in reversed(messages):
-                if isinstance(msg, dict):
-                    content = msg.get("content", "")
-                    if content and content.strip() and msg.get("role") != "user":
-                        return jsonify({"response": content})
+        messages = result.get("messages", [])
+        content, is_answer = find_response(messages)
+        if content is not None:
+            if is_answer:
+                remember_answer(query, messages, content)
+            return respond({"response": content, "thread_id": thread_id})
         
-        return jsonify({
-            "error": "No response generated",
-            "debug": {
-                "total_messages": len(messages),
-                "message_roles": [msg.get("role", "unknown") if isinstance(msg, dict) else type(msg).__name__ for msg in messages],
-                "last_message": messages[-1] if messages else None
-            }
-        }), 200
+        return respond(no_response_payload(thread_id, messages)), 200
         
     except Exception as e:
         print(f"Error in handle_query: {str(e)}")
@@ -82,13 +175,83 @@ def handle_query():
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
 
 
+@app.route('/query/stream', methods=['POST'])
+def handle_query_stream():
+    """Stream node progress and answer tokens as Server-Sent Events."""
+    query, thread_id, error = parse_query_request(request.json)
+    if error:
+        return jsonify({"error": error}), 400
+    
+    trace_id = uuid.uuid4().hex
+    
+    def events():
+        yield sse_event({'type': 'thread', 'thread_id': thread_id})
+        try:
+            for event in stream_agent(app_context.agent, query, thread_id, trace_id=trace_id):
+                yield sse_event(event)
+        except Exception as e:
+            print(f"Error in handle_query_stream: {str(e)}")
+            yield sse_event({'type': 'error', 'error': str(e)})
+    
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Thread-Id": thread_id, "X-Trace-Id": trace_id}
+    )
+
+
+@app.after_request
+def add_trace_header(response):
+    trace_id = g.get("trace_id")
+    if trace_id:
+        response.headers["X-Trace-Id"] = trace_id
+    return response
+
+
+@app.route('/traces', methods=['GET'])
+def list_traces():
+    """Summaries of recent request traces, newest first (filter with ?thread_id=)."""
+    if not trace_access_allowed(request.headers.get("Authorization")):
+        return jsonify({"error": "Not found"}), 404
+    return jsonify({"traces": tracer.recent_traces(**trace_filters(request.args.get("thread_id")))})
+
+
+@app.route('/traces/<trace_id>', methods=['GET'])
+def get_trace(trace_id):
+    """Full span and event record of one recent request."""
+    if not trace_access_allowed(request.headers.get("Authorization")):
+        return jsonify({"error": "Not found"}), 404
+    trace = tracer.get_trace(trace_id)
+    if trace is None:
+        return jsonify({"error": "Trace not found"}), 404
+    return jsonify(trace)
+
+
+@app.route('/threads/<thread_id>/usage', methods=['GET'])
+def thread_usage(thread_id):
+    """LLM and embedding usage accumulated over every turn of a conversation."""
+    if not app_context.ready:
+        return jsonify({"error": "Agent is not loaded yet"}), 503
+    values = app_context.agent.get_state({"configurable": {"thread_id": thread_id}}).values
+    report = thread_usage_report(thread_id, values)
+    if report is None:
+        return jsonify({"error": "Thread not found"}), 404
+    return jsonify(report)
+
+
 @app.route('/health', methods=['GET'])
 def health_check():
-    return jsonify({"status": "healthy"})
+    """Report readiness without triggering a load; stats are included once the agent is ready."""
+    health, status_code = health_report(app_context.agent if app_context.ready else None)
+    return jsonify(health), status_code
 
 
 if __name__ == '__main__':
     if not os.getenv("GOOGLE_API_KEY"):
         print("Warning: GOOGLE_API_KEY not found in environment variables")
     
+    # The debug reloader runs this block in a watcher process and again in the
+    # serving child, which it marks with WERKZEUG_RUN_MAIN; only the child loads.
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        app_context.warm_up(background=True)
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
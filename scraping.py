@@ -5,15 +5,522 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from abc import ABC, abstractmethod
+import hashlib
 import json
+import os
+import queue
+import threading
 import time
 import re
-from urllib.parse import urljoin
+from datetime import datetime, timezone
+from urllib.parse import urljoin, urlparse
 
-class EvaPharmaJobScraper:
-    def __init__(self, headless=True):
+DETAIL_CONTENT_SELECTORS = '[data-ui="job-description"], [data-ui="job-requirements"]'
+
+WORKABLE_ACCOUNT = "eva-pharma"
+WORKABLE_API_URL = "https://apply.workable.com/api"
+
+WORKPLACE_LABELS = {"on_site": "On-site", "hybrid": "Hybrid", "remote": "Remote"}
+JOB_TYPE_LABELS = {
+    "full": "Full time",
+    "part": "Part time",
+    "contract": "Contract",
+    "temporary": "Temporary",
+    "internship": "Internship",
+    "other": "Other"
+}
+
+
+class HostRateLimiter:
+    """Politeness limit shared by all workers: at most one request per host every min_interval seconds."""
+    def __init__(self, min_interval=0.5):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_allowed = {}
+    
+    def wait(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            scheduled = max(now, self._next_allowed.get(host, now))
+            self._next_allowed[host] = scheduled + self.min_interval
+        if scheduled > now:
+            time.sleep(scheduled - now)
+
+
+DETAIL_FIELDS = ('company_overview', 'job_summary', 'key_responsibilities', 'requirements')
+
+
+def _hash_record(record):
+    return hashlib.sha256(json.dumps(record, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class ScrapeCache:
+    """Persistent per-posting cache keyed by job_url.
+
+    Each entry holds the hash of the listing card, the hash of the full job
+    record, the posted date, the fetch time and the record itself, so a run
+    can skip detail pages whose listing card is unchanged and report what
+    changed since the previous run.
+    """
+    def __init__(self, path="data/scrape_cache.json", max_age_hours=168):
+        self.path = path
+        self.max_age_hours = max_age_hours
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+    
+    @staticmethod
+    def listing_hash(job):
+        listing = {key: value for key, value in job.items() if key not in DETAIL_FIELDS}
+        # Relative dates ("Posted 3 days ago") change daily without the posting changing.
+        if str(listing.get('posted_date', '')).lower().startswith('posted'):
+            listing.pop('posted_date')
+        return _hash_record(listing)
+    
+    @staticmethod
+    def content_hash(job):
+        return _hash_record({key: value for key, value in job.items() if key != 'posted_date'})
+    
+    def fresh_details(self, job):
+        """Return the cached record when the listing card is unchanged and its details were recently fetched."""
+        entry = self.entries.get(job['job_url'])
+        if not entry or entry.get('listing_hash') != self.listing_hash(job):
+            return None
+        # Postings whose detail fetch never succeeded are stored without fetched_at.
+        if not entry.get('fetched_at') or not any(entry['job'].get(field) for field in DETAIL_FIELDS):
+            return None
+        fetched_at = datetime.fromisoformat(entry['fetched_at'])
+        age_hours = (datetime.now(timezone.utc) - fetched_at).total_seconds() / 3600
+        if age_hours > self.max_age_hours:
+            return None
+        return {**entry['job'], 'posted_date': job.get('posted_date', entry['job'].get('posted_date'))}
+    
+    def cached_job(self, job_url):
+        entry = self.entries.get(job_url)
+        return entry['job'] if entry else None
+    
+    def update(self, jobs, fetched_urls):
+        """Store this run's jobs and return the delta against the previous run."""
+        delta = {'added': [], 'changed': [], 'removed': []}
+        now = datetime.now(timezone.utc).isoformat()
+        entries = {}
+        for job in jobs:
+            url = job['job_url']
+            previous = self.entries.get(url)
+            content_hash = self.content_hash(job)
+            if previous is None:
+                delta['added'].append(job)
+            elif previous['content_hash'] != content_hash:
+                delta['changed'].append(job)
+            
+            if url in fetched_urls:
+                fetched_at = now
+            else:
+                fetched_at = previous.get('fetched_at') if previous else None
+            entries[url] = {
+                'listing_hash': self.listing_hash(job),
+                'content_hash': content_hash,
+                'posted_date': job.get('posted_date'),
+                'fetched_at': fetched_at,
+                'job': job
+            }
+        delta['removed'] = [
+            entry['job'] for url, entry in self.entries.items() if url not in entries
+        ]
+        self.entries = entries
+        return delta
+    
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=2, ensure_ascii=False)
+        os.replace(self.path + ".tmp", self.path)
+
+
+class HtmlTextExtractor(HTMLParser):
+    """Collect visible text lines and list items from a job description HTML fragment."""
+    BLOCK_TAGS = {'p', 'div', 'br', 'li', 'ul', 'ol', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'tr', 'section'}
+    
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+        self.list_items = []
+        self._buffer = []
+        self._in_list_item = 0
+    
+    def _flush(self):
+        text = re.sub(r'\s+', ' ', ''.join(self._buffer)).strip()
+        self._buffer = []
+        if text:
+            self.lines.append(text)
+            if self._in_list_item:
+                self.list_items.append(text)
+    
+    def handle_starttag(self, tag, attrs):
+        if tag in self.BLOCK_TAGS:
+            self._flush()
+        if tag == 'li':
+            self._in_list_item += 1
+    
+    def handle_endtag(self, tag):
+        if tag in self.BLOCK_TAGS:
+            self._flush()
+        if tag == 'li':
+            self._in_list_item = max(0, self._in_list_item - 1)
+    
+    def handle_data(self, data):
+        self._buffer.append(data)
+    
+    @classmethod
+    def extract(cls, html):
+        parser = cls()
+        parser.feed(html or '')
+        parser.close()
+        parser._flush()
+        return parser
+
+
+class BaseJobScraper(ABC):
+    """Backend-independent scraping flow and text parsing shared by all scrapers."""
+    def __init__(self, workers=1, min_request_interval=0.5, rate_limiter=None, cache_path=None):
         self.base_url = "https://apply.workable.com/eva-pharma/"
         self.jobs_data = []
+        self.workers = max(1, workers)
+        self.rate_limiter = rate_limiter or HostRateLimiter(min_request_interval)
+        self.cache = ScrapeCache(cache_path) if cache_path else None
+        self.delta = None
+    
+    @abstractmethod
+    def get_job_listings(self):
+        """Return the listing cards (job_id, job_url, title, location, ...) of all open postings."""
+    
+    @abstractmethod
+    def get_job_details(self, job_url):
+        """Return the detail fields (DETAIL_FIELDS) parsed from one posting."""
+    
+    def _create_detail_sessions(self):
+        """Return the scrapers that detail workers draw from; self is always included."""
+        return [self] * self.workers
+    
+    def parse_line_by_line(self, lines):
+        sections = {
+            'company_overview': '',
+            'job_summary': '',
+            'key_responsibilities': '',
+            'requirements': ''
+        }
+        
+        current_section = None
+        content_buffer = []
+        
+        for line in lines:
+            line_lower = line.lower().strip()
+            
+            if not line_lower:
+                continue
+            
+            if line_lower == 'company overview' or line_lower.startswith('company overview'):
+                if current_section and content_buffer:
+                    sections[current_section] = '\n'.join(content_buffer).strip()
+                current_section = 'company_overview'
+                content_buffer = []
+                if ':' in line:
+                    after_colon = line.split(':', 1)[1].strip()
+                    if after_colon:
+                        content_buffer.append(after_colon)
+            
+            elif line_lower == 'job summary' or line_lower.startswith('job summary'):
+                if current_section and content_buffer:
+                    sections[current_section] = '\n'.join(content_buffer).strip()
+                current_section = 'job_summary'
+                content_buffer = []
+                if ':' in line:
+                    after_colon = line.split(':', 1)[1].strip()
+                    if after_colon:
+                        content_buffer.append(after_colon)
+            
+            elif line_lower == 'key responsibilities' or line_lower.startswith('key responsibilities') or \
+                 line_lower == 'responsibilities' or line_lower.startswith('responsibilities'):
+                if current_section and content_buffer:
+                    sections[current_section] = '\n'.join(content_buffer).strip()
+                current_section = 'key_responsibilities'
+                content_buffer = []
+                if ':' in line:
+                    after_colon = line.split(':', 1)[1].strip()
+                    if after_colon:
+                        content_buffer.append(after_colon)
+            
+            elif line_lower == 'requirements' or line_lower.startswith('requirements') or \
+                 line_lower == 'qualifications' or line_lower.startswith('qualifications'):
+                if current_section and content_buffer:
+                    sections[current_section] = '\n'.join(content_buffer).strip()
+                current_section = 'requirements'
+                content_buffer = []
+                if ':' in line:
+                    after_colon = line.split(':', 1)[1].strip()
+                    if after_colon:
+                        content_buffer.append(after_colon)
+            
+            else:
+                if current_section and line and len(line.strip()) > 2:
+                    if not any(skip in line_lower for skip in [
+                        'view website', 'view all jobs', 'help', 'accessibility', 
+                        'powered by', 'workable', 'apply now', 'share', 'save'
+                    ]):
+                        content_buffer.append(line.strip())
+        
+        if current_section and content_buffer:
+            sections[current_section] = '\n'.join(content_buffer).strip()
+        
+        return sections
+    
+    def parse_description_sections(self, text):
+        sections = {
+            'company_overview': '',
+            'job_summary': '',
+            'key_responsibilities': ''
+        }
+        
+        if not text:
+            return sections
+        
+        lines = [line.strip() for line in text.split('\n') if line.strip()]
+        
+        current_section = None
+        content_buffer = []
+        i = 0
+        
+        while i < len(lines):
+            line = lines[i]
+            line_lower = line.lower()
+            
+            if line_lower == 'company overview' or line_lower.startswith('company overview'):
+                if current_section and content_buffer:
+                    sections[current_section] = '\n'.join(content_buffer).strip()
+                
+                current_section = 'company_overview'
+                content_buffer = []
+                
+                if ':' in line:
+                    after_colon = line.split(':', 1)[1].strip()
+                    if after_colon:
+                        content_buffer.append(after_colon)
+            
+            elif line_lower == 'job summary' or line_lower.startswith('job summary'):
+                if current_section and content_buffer:
+                    sections[current_section] = '\n'.join(content_buffer).strip()
+                
+                current_section = 'job_summary'
+                content_buffer = []
+                
+                if ':' in line:
+                    after_colon = line.split(':', 1)[1].strip()
+                    if after_colon:
+                        content_buffer.append(after_colon)
+            
+            elif any(keyword in line_lower for keyword in ['key responsibilities', 'responsibilities']):
+                if current_section and content_buffer:
+                    sections[current_section] = '\n'.join(content_buffer).strip()
+                
+                current_section = 'key_responsibilities'
+                content_buffer = []
+                
+                if ':' in line:
+                    after_colon = line.split(':', 1)[1].strip()
+                    if after_colon:
+                        content_buffer.append(after_colon)
+            
+            elif any(keyword in line_lower for keyword in ['requirements', 'qualifications']):
+                if current_section and content_buffer:
+                    sections[current_section] = '\n'.join(content_buffer).strip()
+                break
+            
+            else:
+                if current_section and line:
+                    if not any(skip in line_lower for skip in [
+                        'view website', 'view all jobs', 'help', 'accessibility', 'powered by', 
+                        'workable', 'apply', 'share', 'save'
+                    ]):
+                        content_buffer.append(line)
+            
+            i += 1
+        
+        if current_section and content_buffer:
+            sections[current_section] = '\n'.join(content_buffer).strip()
+        
+        return sections
+    
+    def parse_structured_content(self, text):
+        sections = {
+            'company_overview': '',
+            'job_summary': '',
+            'key_responsibilities': '',
+            'requirements': ''
+        }
+        
+        if not text:
+            return sections
+        
+        lines = [line.strip() for line in text.split('\n') if line.strip()]
+        
+        filtered_lines = []
+        for line in lines:
+            line_lower = line.lower()
+            if not any(skip_phrase in line_lower for skip_phrase in [
+                'view website', 'view all jobs', 'help', 'accessibility', 'powered by workable',
+                'apply', 'share', 'save', 'back to', 'jobs', 'workable'
+            ]):
+                filtered_lines.append(line)
+        
+        sections = self.parse_line_by_line(filtered_lines)
+        
+        return sections
+    
+    def scrape_all_jobs(self):
+        try:
+            jobs = self.get_job_listings()
+            
+            if not jobs:
+                print("No jobs found!")
+                return []
+            
+            results = {}
+            if self.cache:
+                for job in jobs:
+                    cached = self.cache.fresh_details(job)
+                    if cached:
+                        results[job['job_url']] = cached
+                print(f"{len(results)} of {len(jobs)} listings unchanged, reusing cached details")
+            to_fetch = [job for job in jobs if job['job_url'] not in results]
+            
+            if self.workers > 1 and len(to_fetch) > 1:
+                fetched = self._scrape_details_parallel(to_fetch)
+            else:
+                fetched = []
+                for i, job in enumerate(to_fetch, 1):
+                    print(f"Processing job {i}/{len(to_fetch)}: {job['title']}")
+                    fetched.append(self._scrape_job(self, job))
+            
+            fetched_urls = set()
+            for job in fetched:
+                if any(job.get(field) for field in DETAIL_FIELDS):
+                    fetched_urls.add(job['job_url'])
+                elif self.cache and self.cache.cached_job(job['job_url']):
+                    # Keep the last good details rather than dropping them on a failed fetch.
+                    job = {**self.cache.cached_job(job['job_url']), **job}
+                results[job['job_url']] = job
+            
+            self.jobs_data.extend(results[job['job_url']] for job in jobs)
+            
+            if self.cache:
+                self.delta = self.cache.update(self.jobs_data, fetched_urls)
+                self.cache.save()
+                print(
+                    f"Delta: {len(self.delta['added'])} added, {len(self.delta['changed'])} changed, "
+                    f"{len(self.delta['removed'])} removed"
+                )
+            
+            return self.jobs_data
+            
+        except Exception as e:
+            print(f"Error during scraping: {e}")
+            return self.jobs_data
+    
+    def _scrape_job(self, scraper, job):
+        try:
+            job_details = scraper.get_job_details(job['job_url'])
+            
+            complete_job_data = {**job, **job_details}
+            print(f"Successfully processed: {job['title']}")
+            return complete_job_data
+            
+        except Exception as e:
+            print(f"Error processing job {job['title']}: {e}")
+            return job
+    
+    def _scrape_details_parallel(self, jobs):
+        """Fetch job detail pages on a pool of browser sessions, preserving listing order."""
+        print(f"Fetching {len(jobs)} job details with {self.workers} workers")
+        sessions = self._create_detail_sessions()
+        pool = queue.Queue()
+        for session in sessions:
+            pool.put(session)
+        
+        def scrape(job):
+            scraper = pool.get()
+            try:
+                return self._scrape_job(scraper, job)
+            finally:
+                pool.put(scraper)
+        
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                return list(executor.map(scrape, jobs))
+        finally:
+            for session in sessions:
+                if session is not self:
+                    session.close()
+    
+    def save_delta(self, filename='scrape_delta.json'):
+        if self.delta is None:
+            return
+        try:
+            with open(filename, 'w', encoding='utf-8') as f:
+                json.dump(self.delta, f, indent=2, ensure_ascii=False)
+            print(f"Delta saved to {filename}")
+        except Exception as e:
+            print(f"Error saving delta: {e}")
+    
+    def save_to_json(self, filename='eva_pharma_jobs.json'):
+        try:
+            with open(filename, 'w', encoding='utf-8') as f:
+                json.dump(self.jobs_data, f, indent=2, ensure_ascii=False)
+            print(f"Data saved to {filename}")
+        except Exception as e:
+            print(f"Error saving to file: {e}")
+    
+    def print_job_summary(self):
+        if not self.jobs_data:
+            print("No jobs data available")
+            return
+        
+        print(f"\n=== JOB SCRAPING SUMMARY ===")
+        print(f"Total jobs scraped: {len(self.jobs_data)}")
+        
+        complete_jobs = 0
+        for job in self.jobs_data:
+            if any(job.get(field, '').strip() for field in ['job_summary', 'key_responsibilities', 'requirements']):
+                complete_jobs += 1
+        
+        print(f"Jobs with detailed information: {complete_jobs}")
+        print(f"Jobs with basic information only: {len(self.jobs_data) - complete_jobs}")
+        
+        return {
+            'company_overview': 'Error loading details',
+            'job_summary': 'Error loading details',
+            'key_responsibilities': 'Error loading details',
+            'requirements': 'Error loading details'
+        }
+    
+    
+    def close(self):
+        pass
+
+
+class EvaPharmaJobScraper(BaseJobScraper):
+    def __init__(self, headless=True, workers=1, min_request_interval=0.5, rate_limiter=None, cache_path=None):
+        super().__init__(workers, min_request_interval, rate_limiter, cache_path)
+        self.headless = headless
         
         chrome_options = Options()
         if headless:
@@ -104,8 +611,14 @@ class EvaPharmaJobScraper:
                 try:
                     show_more_button = self.driver.find_element(By.CSS_SELECTOR, "[data-ui='load-more-button']")
                     if show_more_button.is_displayed() and show_more_button.is_enabled():
+                        loaded = len(self.driver.find_elements(By.CSS_SELECTOR, "[data-ui='job']"))
                         self.driver.execute_script("arguments[0].click();", show_more_button)
-                        time.sleep(3) 
+                        try:
+                            self.wait.until(
+                                lambda d: len(d.find_elements(By.CSS_SELECTOR, "[data-ui='job']")) > loaded
+                            )
+                        except TimeoutException:
+                            break
                     else:
                         break
                 except NoSuchElementException:
@@ -174,103 +687,36 @@ class EvaPharmaJobScraper:
                 'job_id': job_id,
                 'job_url': job_url,
                 'title': title,
-                'workplace_type': workplace_type,
-                'location': location,
-                'department': department,
-                'job_type': job_type,
-                'posted_date': posted_date
-            }
-            
-        except Exception as e:
-            print(f"Error extracting basic job info: {e}")
-            return None
-    
-    def get_job_details(self, job_url):
-        print(f"Fetching details for: {job_url}")
-        
-        try:
-            self.driver.get(job_url)
-            
-            self.wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-            time.sleep(3)  
-            
-            job_details = self.extract_job_content_advanced()
-            
-            return job_details
-            
-        except Exception as e:
-            print(f"Error loading job details page: {e}")
-    def parse_line_by_line(self, lines):
-        sections = {
-            'company_overview': '',
-            'job_summary': '',
-            'key_responsibilities': '',
-            'requirements': ''
-        }
-        
-        current_section = None
-        content_buffer = []
-        
-        for line in lines:
-            line_lower = line.lower().strip()
-            
-            if not line_lower:
-                continue
+                'workplace_type': workplace_type,
+                'location': location,
+                'department': department,
+                'job_type': job_type,
+                'posted_date': posted_date
+            }
             
-            if line_lower == 'company overview' or line_lower.startswith('company overview'):
-                if current_section and content_buffer:
-                    sections[current_section] = '\n'.join(content_buffer).strip()
-                current_section = 'company_overview'
-                content_buffer = []
-                if ':' in line:
-                    after_colon = line.split(':', 1)[1].strip()
-                    if after_colon:
-                        content_buffer.append(after_colon)
+        except Exception as e:
+            print(f"Error extracting basic job info: {e}")
+            return None
+    
+    def get_job_details(self, job_url):
+        print(f"Fetching details for: {job_url}")
+        
+        try:
+            self.rate_limiter.wait(job_url)
+            self.driver.get(job_url)
             
-            elif line_lower == 'job summary' or line_lower.startswith('job summary'):
-                if current_section and content_buffer:
-                    sections[current_section] = '\n'.join(content_buffer).strip()
-                current_section = 'job_summary'
-                content_buffer = []
-                if ':' in line:
-                    after_colon = line.split(':', 1)[1].strip()
-                    if after_colon:
-                        content_buffer.append(after_colon)
+            try:
+                self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, DETAIL_CONTENT_SELECTORS)))
+            except TimeoutException:
+                # Fall back to the generic text and heading parsers below.
+                self.wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
             
-            elif line_lower == 'key responsibilities' or line_lower.startswith('key responsibilities') or \
-                 line_lower == 'responsibilities' or line_lower.startswith('responsibilities'):
-                if current_section and content_buffer:
-                    sections[current_section] = '\n'.join(content_buffer).strip()
-                current_section = 'key_responsibilities'
-                content_buffer = []
-                if ':' in line:
-                    after_colon = line.split(':', 1)[1].strip()
-                    if after_colon:
-                        content_buffer.append(after_colon)
+            job_details = self.extract_job_content_advanced()
             
-            elif line_lower == 'requirements' or line_lower.startswith('requirements') or \
-                 line_lower == 'qualifications' or line_lower.startswith('qualifications'):
-                if current_section and content_buffer:
-                    sections[current_section] = '\n'.join(content_buffer).strip()
-                current_section = 'requirements'
-                content_buffer = []
-                if ':' in line:
-                    after_colon = line.split(':', 1)[1].strip()
-                    if after_colon:
-                        content_buffer.append(after_colon)
+            return job_details
             
-            else:
-                if current_section and line and len(line.strip()) > 2:
-                    if not any(skip in line_lower for skip in [
-                        'view website', 'view all jobs', 'help', 'accessibility', 
-                        'powered by', 'workable', 'apply now', 'share', 'save'
-                    ]):
-                        content_buffer.append(line.strip())
-        
-        if current_section and content_buffer:
-            sections[current_section] = '\n'.join(content_buffer).strip()
-        
-        return sections
+        except Exception as e:
+            print(f"Error loading job details page: {e}")
     
     def extract_job_content_advanced(self):
         job_details = {
@@ -385,82 +831,6 @@ class EvaPharmaJobScraper:
         
         return details
     
-    def parse_description_sections(self, text):
-        sections = {
-            'company_overview': '',
-            'job_summary': '',
-            'key_responsibilities': ''
-        }
-        
-        if not text:
-            return sections
-        
-        lines = [line.strip() for line in text.split('\n') if line.strip()]
-        
-        current_section = None
-        content_buffer = []
-        i = 0
-        
-        while i < len(lines):
-            line = lines[i]
-            line_lower = line.lower()
-            
-            if line_lower == 'company overview' or line_lower.startswith('company overview'):
-                if current_section and content_buffer:
-                    sections[current_section] = '\n'.join(content_buffer).strip()
-                
-                current_section = 'company_overview'
-                content_buffer = []
-                
-                if ':' in line:
-                    after_colon = line.split(':', 1)[1].strip()
-                    if after_colon:
-                        content_buffer.append(after_colon)
-            
-            elif line_lower == 'job summary' or line_lower.startswith('job summary'):
-                if current_section and content_buffer:
-                    sections[current_section] = '\n'.join(content_buffer).strip()
-                
-                current_section = 'job_summary'
-                content_buffer = []
-                
-                if ':' in line:
-                    after_colon = line.split(':', 1)[1].strip()
-                    if after_colon:
-                        content_buffer.append(after_colon)
-            
-            elif any(keyword in line_lower for keyword in ['key responsibilities', 'responsibilities']):
-                if current_section and content_buffer:
-                    sections[current_section] = '\n'.join(content_buffer).strip()
-                
-                current_section = 'key_responsibilities'
-                content_buffer = []
-                
-                if ':' in line:
-                    after_colon = line.split(':', 1)[1].strip()
-                    if after_colon:
-                        content_buffer.append(after_colon)
-            
-            elif any(keyword in line_lower for keyword in ['requirements', 'qualifications']):
-                if current_section and content_buffer:
-                    sections[current_section] = '\n'.join(content_buffer).strip()
-                break
-            
-            else:
-                if current_section and line:
-                    if not any(skip in line_lower for skip in [
-                        'view website', 'view all jobs', 'help', 'accessibility', 'powered by', 
-                        'workable', 'apply', 'share', 'save'
-                    ]):
-                        content_buffer.append(line)
-            
-            i += 1
-        
-        if current_section and content_buffer:
-            sections[current_section] = '\n'.join(content_buffer).strip()
-        
-        return sections
-    
     def extract_from_html_structure(self):
         details = {
             'company_overview': '',
@@ -525,106 +895,217 @@ class EvaPharmaJobScraper:
             print(f"Error getting content after element: {e}")
             return ""
     
-    def parse_structured_content(self, text):
-        sections = {
-            'company_overview': '',
-            'job_summary': '',
-            'key_responsibilities': '',
-            'requirements': ''
-        }
-        
-        if not text:
-            return sections
-        
-        lines = [line.strip() for line in text.split('\n') if line.strip()]
+    def _create_detail_sessions(self):
+        # Each Selenium worker needs its own browser.
+        return [self] + [
+            type(self)(headless=self.headless, rate_limiter=self.rate_limiter)
+            for _ in range(self.workers - 1)
+        ]
+    
+    def close(self):
+        if self.driver:
+            self.driver.quit()
+
+class EvaPharmaHttpScraper(BaseJobScraper):
+    """Scrape postings from Workable's public JSON API over a pooled HTTP session.
+
+    With fixtures_dir set, responses are replayed from (or, with record=True,
+    saved to) JSON files so the scraper can run offline.
+    """
+    def __init__(self, workers=1, min_request_interval=0.5, rate_limiter=None, cache_path=None,
+                 fixtures_dir=None, record=False, timeout=15):
+        super().__init__(workers, min_request_interval, rate_limiter, cache_path)
+        self.api_url = f"{WORKABLE_API_URL}/v3/accounts/{WORKABLE_ACCOUNT}/jobs"
+        self.detail_api_url = f"{WORKABLE_API_URL}/v2/accounts/{WORKABLE_ACCOUNT}/jobs"
+        self.fixtures_dir = fixtures_dir
+        self.record = record
+        self.timeout = timeout
         
-        filtered_lines = []
-        for line in lines:
-            line_lower = line.lower()
-            if not any(skip_phrase in line_lower for skip_phrase in [
-                'view website', 'view all jobs', 'help', 'accessibility', 'powered by workable',
-                'apply', 'share', 'save', 'back to', 'jobs', 'workable'
-            ]):
-                filtered_lines.append(line)
+        self.session = requests.Session()
+        retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504],
+                        allowed_methods=None)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.workers, max_retries=retries)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+            "Accept": "application/json"
+        })
+    
+    def _fixture_path(self, method, url, body):
+        key = hashlib.sha1(f"{method} {url} {json.dumps(body, sort_keys=True)}".encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.fixtures_dir, f"{key}.json")
+    
+    def _request_json(self, method, url, body=None):
+        if self.fixtures_dir and not self.record:
+            with open(self._fixture_path(method, url, body), 'r', encoding='utf-8') as f:
+                return json.load(f)
         
-        sections = self.parse_line_by_line(filtered_lines)
+        self.rate_limiter.wait(url)
+        response = self.session.request(method, url, json=body, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
         
-        return sections
+        if self.fixtures_dir and self.record:
+            os.makedirs(self.fixtures_dir, exist_ok=True)
+            with open(self._fixture_path(method, url, body), 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+        return data
     
-    def scrape_all_jobs(self):
-        try:
-            jobs = self.get_job_listings()
-            
-            if not jobs:
-                print("No jobs found!")
-                return []
-            
-            for i, job in enumerate(jobs, 1):
-                print(f"Processing job {i}/{len(jobs)}: {job['title']}")
-                
-                try:
-                    job_details = self.get_job_details(job['job_url'])
-                    
-                    complete_job_data = {**job, **job_details}
-                    self.jobs_data.append(complete_job_data)
-                    
-                    print(f"Successfully processed: {job['title']}")
-                    
-                except Exception as e:
-                    print(f"Error processing job {job['title']}: {e}")
-                    self.jobs_data.append(job)
-                
-                time.sleep(2)
-            
-            return self.jobs_data
-            
-        except Exception as e:
-            print(f"Error during scraping: {e}")
-            return self.jobs_data
+    def get_job_listings(self):
+        print("Loading job listings from the Workable API...")
+        jobs = []
+        token = None
+        while True:
+            body = {"query": "", "location": [], "department": [], "worktype": [], "remote": []}
+            if token:
+                body["token"] = token
+            data = self._request_json("POST", self.api_url, body)
+            for result in data.get("results", []):
+                job = self.extract_job_basic_info(result)
+                if job:
+                    jobs.append(job)
+            token = data.get("nextPage")
+            if not token:
+                break
+        print(f"Found {len(jobs)} job listings")
+        return jobs
     
-    def save_to_json(self, filename='eva_pharma_jobs.json'):
-        try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(self.jobs_data, f, indent=2, ensure_ascii=False)
-            print(f"Data saved to {filename}")
-        except Exception as e:
-            print(f"Error saving to file: {e}")
+    def _format_location(self, location):
+        parts = [location.get(key) for key in ("city", "region", "country")]
+        return ', '.join(part for part in parts if part)
     
-    def print_job_summary(self):
-        if not self.jobs_data:
-            print("No jobs data available")
-            return
-        
-        print(f"\n=== JOB SCRAPING SUMMARY ===")
-        print(f"Total jobs scraped: {len(self.jobs_data)}")
+    def extract_job_basic_info(self, result):
+        shortcode = result.get("shortcode")
+        if not shortcode:
+            return None
+        locations = result.get("locations") or ([result["location"]] if result.get("location") else [])
+        location = ', '.join(filter(None, (self._format_location(loc) for loc in locations)))
+        department = result.get("department") or []
+        if isinstance(department, list):
+            department = ', '.join(department)
+        return {
+            'job_id': shortcode,
+            'job_url': urljoin(self.base_url, f"j/{shortcode}/"),
+            'title': (result.get("title") or "").strip(),
+            'workplace_type': WORKPLACE_LABELS.get(result.get("workplace"), "Not specified"),
+            'location': location or "Not specified",
+            'department': department or "Not specified",
+            'job_type': JOB_TYPE_LABELS.get(result.get("type"), "Not specified"),
+            'posted_date': result["published"][:10] if result.get("published") else "Not specified"
+        }
+    
+    def get_job_details(self, job_url):
+        print(f"Fetching details for: {job_url}")
+        shortcode = urlparse(job_url).path.rstrip('/').split('/')[-1]
+        data = self._request_json("GET", f"{self.detail_api_url}/{shortcode}")
         
-        complete_jobs = 0
-        for job in self.jobs_data:
-            if any(job.get(field, '').strip() for field in ['job_summary', 'key_responsibilities', 'requirements']):
-                complete_jobs += 1
+        details = {
+            'company_overview': '',
+            'job_summary': '',
+            'key_responsibilities': '',
+            'requirements': ''
+        }
         
-        print(f"Jobs with detailed information: {complete_jobs}")
-        print(f"Jobs with basic information only: {len(self.jobs_data) - complete_jobs}")
+        description = HtmlTextExtractor.extract(data.get("description"))
+        details.update({
+            key: value for key, value in
+            self.parse_description_sections('\n'.join(description.lines)).items() if value
+        })
         
-        return {
-            'company_overview': 'Error loading details',
-            'job_summary': 'Error loading details',
-            'key_responsibilities': 'Error loading details',
-            'requirements': 'Error loading details'
-        }
+        requirements = HtmlTextExtractor.extract(data.get("requirements"))
+        if requirements.list_items:
+            details['requirements'] = '\n'.join(f"• {item}" for item in requirements.list_items)
+        else:
+            details['requirements'] = '\n'.join(requirements.lines)
+            if details['requirements'].startswith('Requirements'):
+                details['requirements'] = details['requirements'].replace('Requirements', '', 1).strip()
+        return details
     
     def close(self):
-        if self.driver:
-            self.driver.quit()
+        self.session.close()
+
+
+def create_scraper(backend="selenium", **kwargs):
+    """Create a scraper for the given backend; "auto" prefers HTTP and falls back to Selenium."""
+    if backend == "selenium":
+        return EvaPharmaJobScraper(headless=kwargs.pop("headless", True), **kwargs)
+    return EvaPharmaHttpScraper(**kwargs)
+
+
+def _missing_details(jobs):
+    return sum(1 for job in jobs if not any(job.get(field) for field in DETAIL_FIELDS))
+
+
+def scrape_jobs(backend="selenium", **kwargs):
+    """Scrape all jobs.
+
+    With backend="auto" the HTTP API is tried first; when it yields no jobs,
+    or detail fields are empty for most of them (the API's response shape
+    changed), the run is repeated with Selenium from the previous cache.
+    """
+    scraper = create_scraper(backend, **kwargs)
+    previous_entries = dict(scraper.cache.entries) if scraper.cache else None
+    try:
+        jobs = scraper.scrape_all_jobs()
+    except Exception as e:
+        print(f"Error during scraping: {e}")
+        jobs = []
+    missing = _missing_details(jobs)
+    if backend == "http" and missing * 2 > len(jobs):
+        print(f"Warning: {missing} of {len(jobs)} jobs have no details")
+    if backend != "auto" or (jobs and missing * 2 <= len(jobs)):
+        return scraper
+    
+    if jobs:
+        print(f"HTTP backend parsed no details for {missing} of {len(jobs)} jobs, falling back to Selenium...")
+    else:
+        print("HTTP backend returned no jobs, falling back to Selenium...")
+    scraper.close()
+    if scraper.cache:
+        # Drop the HTTP run's records so the fallback run diffs against the previous run.
+        scraper.cache.entries = previous_entries
+        scraper.cache.save()
+    kwargs.pop("fixtures_dir", None)
+    kwargs.pop("record", None)
+    scraper = create_scraper("selenium", **kwargs)
+    scraper.scrape_all_jobs()
+    return scraper
+
 
 if __name__ == "__main__":
-    scraper = EvaPharmaJobScraper(headless=True)
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Scrape EVA Pharma job postings.")
+    parser.add_argument("--backend", choices=["auto", "http", "selenium"], default="selenium",
+                        help="browser scraping (selenium), HTTP API scraping with Selenium fallback (auto), "
+                             "or HTTP only")
+    parser.add_argument("--workers", type=int, default=4, help="number of parallel detail fetchers")
+    parser.add_argument("--min-interval", type=float, default=0.5, help="minimum seconds between requests to the host")
+    parser.add_argument("--fixtures", help="directory of recorded API responses to replay (HTTP backend)")
+    parser.add_argument("--record", action="store_true", help="record API responses into --fixtures")
+    parser.add_argument("--cache", default="data/scrape_cache.json",
+                        help="scrape cache used to skip unchanged postings ('' to disable)")
+    parser.add_argument("--output", default="eva_pharma_jobs.json")
+    parser.add_argument("--sync-index", action="store_true",
+                        help="sync the vector index from --output when postings changed "
+                             "(use --output data/jobs.json to update the served catalog)")
+    args = parser.parse_args()
+    
+    options = {"workers": args.workers, "min_request_interval": args.min_interval, "cache_path": args.cache or None}
+    if args.backend != "selenium" and args.fixtures:
+        options.update(fixtures_dir=args.fixtures, record=args.record)
+    
+    print("Starting Eva Pharma job scraping...")
+    scraper = scrape_jobs(args.backend, **options)
     try:
-        print("Starting Eva Pharma job scraping...")
-        jobs_data = scraper.scrape_all_jobs()
         print(f"\nScraping completed!")
         scraper.print_job_summary()
-        scraper.save_to_json()
+        scraper.save_to_json(args.output)
+        scraper.save_delta()
+        
+        if args.sync_index and scraper.jobs_data and (scraper.delta is None or any(scraper.delta.values())):
+            from tools.rag_retriever import JobRetriever
+            JobRetriever(json_path=args.output, sync_db=True)
     except Exception as e:
         print(f"Error during scraping: {e}")
     
@@ -1,18 +1,22 @@
-import streamlit as st
+__import__('pysqlite3')
 import sys
+sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
+import streamlit as st
 import os
 from dotenv import load_dotenv
 import uuid
 from datetime import datetime
 
-# Add the current directory to Python path to import from main.py
+# Add the current directory to Python path to import the agents package
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-# Import the agent directly from main.py
+# Load the agent through the shared application context (built once per process)
 try:
-    from main import agent, prettify_text_for_postman
-except ImportError as e:
-    st.error(f"Error importing from main.py: {str(e)}")
+    from agents.app_context import app_context
+    from agents.langgraph_agent import stream_agent
+    agent = app_context.agent
+except (ImportError, RuntimeError) as e:
+    st.error(f"Error loading the agent: {str(e)}")
     st.stop()
 
 load_dotenv()
@@ -199,62 +203,41 @@ with col3:
         st.session_state.selected_message = predefined_messages[5]
 
 
-def get_chatbot_response(query):
+NODE_STATUS_LABELS = {
+    "agent": "Thinking...",
+    "tools": "Looking up job information...",
+    "rag_retrieval": "Gathering context..."
+}
+
+
+def stream_chatbot_response(query, status):
     """
-    Directly call the agent logic with unique session ID
+    Yield the agent's answer tokens as they arrive, updating the status box with node progress
     """
     try:
-        # Check if agent is available
         if not agent:
-            return "❌ **Error**: Agent not initialized. Please check your environment variables."
+            yield "❌ **Error**: Agent not initialized. Please check your environment variables."
+            return
         
-        # Create the initial state similar to Flask app
-        initial_state = {
-            "messages": [{
-                "role": "user",
-                "content": query
-            }]
-        }
-        
-        # Use unique session ID for each conversation
         session_id = st.session_state.get('conversation_id', 'default_session')
-        config = {"configurable": {"thread_id": session_id}}
-        
-        # Invoke the agent
-        result = agent.invoke(initial_state, config)
-        messages = result.get("messages", [])
-
-        # Extract the response similar to Flask app logic
-        if messages:
-            # First try to find assistant messages
-            for msg in reversed(messages):
-                if isinstance(msg, dict) and msg.get("role") == "assistant":
-                    content = msg.get("content", "")
-                    if content and content.strip():
-                        return content
-            
-            # Fallback to any non-user message
-            for msg in reversed(messages):
-                if isinstance(msg, dict):
-                    content = msg.get("content", "")
-                    if content and content.strip() and msg.get("role") != "user":
-                        return content
-        
-        return "Sorry, I couldn't generate a response. Please try again."
+        streamed = False
+        for event in stream_agent(agent, query, session_id):
+            if event["type"] == "node":
+                status.update(label=NODE_STATUS_LABELS.get(event["node"], "Working..."))
+            elif event["type"] == "token":
+                streamed = True
+                yield event["content"]
+            elif event["type"] == "final" and not streamed:
+                yield event["content"] or "Sorry, I couldn't generate a response. Please try again."
+        status.update(label="Done", state="complete")
         
     except Exception as e:
-        import traceback
-        error_details = traceback.format_exc()
-        print(f"Error in get_chatbot_response: {str(e)}")
-        print(f"Full traceback: {error_details}")
-        
-        # Check for common issues
+        status.update(label="Error", state="error")
+        print(f"Error in stream_chatbot_response: {str(e)}")
         if "GOOGLE_API_KEY" in str(e) or "API key" in str(e):
-            return "❌ **API Key Error**: Please make sure your GOOGLE_API_KEY is properly set in your environment variables."
-        elif "agents.langgraph_agent" in str(e):
-            return "❌ **Import Error**: Unable to load the agent. Please make sure all required files are present."
+            yield "❌ **API Key Error**: Please make sure your GOOGLE_API_KEY is properly set in your environment variables."
         else:
-            return f"❌ **Error**: {str(e)}"
+            yield f"❌ **Error**: {str(e)}"
 
 
 st.subheader("Chat")
@@ -291,9 +274,10 @@ if user_message:
         st.markdown(user_message)
 
     with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-            response = get_chatbot_response(user_message)
-        st.markdown(response)
+        status = st.status("Thinking...", expanded=False)
+        response = st.write_stream(stream_chatbot_response(user_message, status))
+        if not isinstance(response, str):
+            response = "".join(str(part) for part in response)
         
         col1, col2 = st.columns([1, 10])
         with col1:
@@ -0,0 +1,90 @@
+import math
+import re
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+TITLE_WEIGHT = 3
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "of",
+    "on", "or", "that", "the", "to", "with", "will", "you", "your", "our", "we", "this"
+}
+
+
+def tokenize(text: str) -> list:
+    return [token for token in _TOKEN_PATTERN.findall((text or "").lower()) if token not in _STOPWORDS]
+
+
+def job_terms(job: dict) -> list:
+    """Terms indexed for a job: the title (boosted), requirements and responsibilities."""
+    return (
+        tokenize(job.get("title", "")) * TITLE_WEIGHT
+        + tokenize(job.get("requirements", ""))
+        + tokenize(job.get("key_responsibilities", ""))
+    )
+
+
+class BM25Index:
+    """In-memory Okapi BM25 index over job postings, keyed by job_id.
+
+    Exact terms such as "GMP", "QC" or "SAP" and job titles score highly here
+    even when dense similarity ranks generic postings above them.
+    """
+
+    def __init__(self, jobs):
+        self.job_ids = []
+        self._lengths = []
+        self._postings = {}
+        for position, job in enumerate(jobs):
+            terms = job_terms(job)
+            self.job_ids.append(job["job_id"])
+            self._lengths.append(len(terms))
+            counts = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, count in counts.items():
+                self._postings.setdefault(term, []).append((position, count))
+
+        self._average_length = sum(self._lengths) / len(self._lengths) if self._lengths else 0.0
+        total = len(self.job_ids)
+        self._idf = {
+            term: math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+
+    def __len__(self):
+        return len(self.job_ids)
+
+    def search(self, query: str, k: int = 10, allowed_ids=None) -> list:
+        """Return up to k (job_id, score) pairs, best first, optionally restricted to allowed_ids."""
+        scores = {}
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for position, count in self._postings[term]:
+                length_norm = 1 - BM25_B + BM25_B * self._lengths[position] / self._average_length
+                scores[position] = scores.get(position, 0.0) + idf * count * (BM25_K1 + 1) / (
+                    count + BM25_K1 * length_norm
+                )
+
+        ranked = sorted(scores.items(), key=lambda item: -item[1])
+        results = []
+        for position, score in ranked:
+            job_id = self.job_ids[position]
+            if allowed_ids is not None and job_id not in allowed_ids:
+                continue
+            results.append((job_id, score))
+            if len(results) >= k:
+                break
+        return results
+
+
+def reciprocal_rank_fusion(rankings, k: int = 60) -> list:
+    """Fuse several ranked lists of ids into one, scoring each id by sum(1 / (k + rank))."""
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, 1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda item: -scores[item])
@@ -1,12 +1,6 @@
-import google.generativeai as genai
-import os
+from tools.llm_gateway import gateway
 
-def compare_jobs(job1_info: str, job2_info: str, job1_title: str = None, job2_title: str = None):
-    """Compare two job roles using Gemini API with enhanced prompting."""
-    
-    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-    model = genai.GenerativeModel('gemini-2.0-flash')
-    
+def comparison_prompt(job1_info: str, job2_info: str, job1_title: str = None, job2_title: str = None) -> str:
     title1 = job1_title or "Job 1"
     title2 = job2_title or "Job 2"
     
@@ -53,9 +47,18 @@ Please provide a structured comparison with the following sections:
 [Provide actionable advice for someone deciding between these roles]
 
 Important: Make sure to address BOTH roles equally and provide specific, practical insights that would help someone make an informed career decision."""
-    
+    return prompt
+
+def compare_jobs(job1_info: str, job2_info: str, job1_title: str = None, job2_title: str = None):
+    """Compare two job roles using Gemini API with enhanced prompting."""
+    try:
+        return gateway.generate(comparison_prompt(job1_info, job2_info, job1_title, job2_title))
+    except Exception as e:
+        return f"Error comparing jobs: {str(e)}. Please try again or contact support if the issue persists."
+
+async def acompare_jobs(job1_info: str, job2_info: str, job1_title: str = None, job2_title: str = None):
+    """Async compare_jobs()."""
     try:
-        response = model.generate_content(prompt)
-        return response.text
+        return await gateway.agenerate(comparison_prompt(job1_info, job2_info, job1_title, job2_title))
     except Exception as e:
         return f"Error comparing jobs: {str(e)}. Please try again or contact support if the issue persists."
\ No newline at end of file
@@ -0,0 +1,222 @@
+from langchain_core.embeddings import Embeddings
+from collections import OrderedDict
+from array import array
+import asyncio
+import inspect
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# Bounds on the SQLite tier; expired and excess rows are pruned at most once
+# per PRUNE_INTERVAL_SECONDS, least recently used first. Last-use times are
+# batched and written at the same cadence.
+QUERY_CACHE_MAX_ROWS = int(os.getenv("QUERY_CACHE_MAX_ROWS", "50000"))
+QUERY_CACHE_TTL_SECONDS = float(os.getenv("QUERY_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+PRUNE_INTERVAL_SECONDS = 60
+
+
+def normalize_query(text: str) -> str:
+    """Normalize query text so trivially different phrasings share a cache entry."""
+    return re.sub(r"\s+", " ", text.strip().lower())
+
+
+class CachedEmbeddings(Embeddings):
+    """Query-embedding cache with an in-memory LRU tier backed by SQLite.
+
+    Only query embeddings are cached; document embeddings are computed once at
+    index build time and live in the vector store. SQLite rows unused for
+    ttl_seconds are dropped, and at most max_disk_entries are kept.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str,
+                 cache_path: str = "data/embeddings/query_cache.sqlite",
+                 max_memory_entries: int = 1024,
+                 max_disk_entries: int = QUERY_CACHE_MAX_ROWS,
+                 ttl_seconds: float = QUERY_CACHE_TTL_SECONDS):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+        self._touched = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.pruned = 0
+        # Google's embed_documents can embed a batch with the query task type.
+        self._batches_queries = "task_type" in inspect.signature(embeddings.embed_documents).parameters
+
+        self.cache_path = cache_path
+        self._conn = None
+        if cache_path:
+            directory = os.path.dirname(cache_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.reopen()
+
+    def reopen(self):
+        """Open a fresh SQLite connection, e.g. in a worker forked from a preloaded parent."""
+        if not self.cache_path:
+            return
+        with self._lock:
+            self._conn = sqlite3.connect(self.cache_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS query_embeddings ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, used_at REAL NOT NULL DEFAULT 0)"
+            )
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(query_embeddings)")]
+            if "used_at" not in columns:
+                # Caches written before pruning existed; their rows expire first.
+                self._conn.execute("ALTER TABLE query_embeddings ADD COLUMN used_at REAL NOT NULL DEFAULT 0")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS query_embeddings_used_at ON query_embeddings (used_at)"
+            )
+            self._conn.commit()
+
+    def _key(self, text: str) -> str:
+        return f"{self.model_name}\x00{normalize_query(text)}"
+
+    def _remember(self, key: str, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, key: str):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                if self._conn is not None:
+                    self._touched[key] = time.time()
+                    self._prune()
+                return self._memory[key]
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT vector, used_at FROM query_embeddings WHERE key = ?", (key,)
+                ).fetchone()
+                if row:
+                    vector = array("d", row[0]).tolist()
+                    now = time.time()
+                    if now - row[1] > PRUNE_INTERVAL_SECONDS:
+                        self._touched[key] = now
+                    self._prune()
+                    self._remember(key, vector)
+                    self.disk_hits += 1
+                    return vector
+
+            self.misses += 1
+            return None
+
+    def _store(self, key: str, vector):
+        vector = list(vector)
+        with self._lock:
+            self._remember(key, vector)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO query_embeddings (key, vector, used_at) VALUES (?, ?, ?)",
+                    (key, array("d", vector).tobytes(), time.time())
+                )
+                self._conn.commit()
+                self._prune()
+        return vector
+
+    def _prune(self):
+        """Write pending last-use times, then drop expired rows and the least recently
+        used beyond max_disk_entries. Call with the lock held."""
+        now = time.time()
+        if now - self._last_prune < PRUNE_INTERVAL_SECONDS:
+            return
+        self._last_prune = now
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE query_embeddings SET used_at = ? WHERE key = ?",
+                [(used_at, key) for key, used_at in self._touched.items()]
+            )
+            self._touched.clear()
+        removed = 0
+        if self.ttl_seconds:
+            removed += self._conn.execute(
+                "DELETE FROM query_embeddings WHERE used_at < ?", (now - self.ttl_seconds,)
+            ).rowcount
+        if self.max_disk_entries:
+            removed += self._conn.execute(
+                "DELETE FROM query_embeddings WHERE key IN ("
+                "SELECT key FROM query_embeddings ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_disk_entries,)
+            ).rowcount
+        self._conn.commit()
+        self.pruned += removed
+
+    def embed_query(self, text: str):
+        key = self._key(text)
+        vector = self._lookup(key)
+        if vector is None:
+            vector = self._store(key, self.embeddings.embed_query(text))
+        return vector
+
+    def embed_queries(self, texts):
+        """Embed several queries, sending all cache misses in a single batch request."""
+        keys = [self._key(text) for text in texts]
+        vectors = [self._lookup(key) for key in keys]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            miss_texts = [texts[i] for i in missing]
+            if self._batches_queries:
+                embedded = self.embeddings.embed_documents(miss_texts, task_type="RETRIEVAL_QUERY")
+            else:
+                embedded = [self.embeddings.embed_query(text) for text in miss_texts]
+            for i, vector in zip(missing, embedded):
+                vectors[i] = self._store(keys[i], vector)
+        return vectors
+
+    async def aembed_query(self, text: str):
+        key = self._key(text)
+        vector = self._lookup(key)
+        if vector is None:
+            vector = self._store(key, await self.embeddings.aembed_query(text))
+        return vector
+
+    async def aembed_queries(self, texts):
+        keys = [self._key(text) for text in texts]
+        vectors = [self._lookup(key) for key in keys]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            miss_texts = [texts[i] for i in missing]
+            if self._batches_queries:
+                embedded = await self.embeddings.aembed_documents(miss_texts, task_type="RETRIEVAL_QUERY")
+            else:
+                embedded = await asyncio.gather(*(self.embeddings.aembed_query(text) for text in miss_texts))
+            for i, vector in zip(missing, embedded):
+                vectors[i] = self._store(keys[i], vector)
+        return vectors
+
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts):
+        return await self.embeddings.aembed_documents(texts)
+
+    def stats(self) -> dict:
+        with self._lock:
+            disk_entries = (
+                self._conn.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0]
+                if self._conn is not None else 0
+            )
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_entries": disk_entries,
+            "pruned": self.pruned
+        }
@@ -0,0 +1,172 @@
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from types import SimpleNamespace
+from typing import Any, List
+import asyncio
+import hashlib
+import math
+import os
+import re
+import time
+
+FAKE_LLM_LATENCY_MS = float(os.getenv("LLM_FAKE_LATENCY_MS", "0"))
+FAKE_EMBED_LATENCY_MS = float(os.getenv("LLM_FAKE_EMBED_LATENCY_MS", "0"))
+FAKE_EMBEDDING_DIMENSIONS = 256
+FAKE_ANSWER_LINES = 5
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def _wait(latency_ms: float):
+    if latency_ms > 0:
+        time.sleep(latency_ms / 1000)
+
+
+async def _await(latency_ms: float):
+    if latency_ms > 0:
+        await asyncio.sleep(latency_ms / 1000)
+
+
+def _tokens(text: str) -> int:
+    return len(text or "") // 4 + 1
+
+
+def _split_titles(query: str, match):
+    return {"job_titles": re.sub(r"^\s*compare\s+", "", query, flags=re.IGNORECASE)}
+
+
+def _location(query: str, match):
+    return {"location": match.group(1).strip(" ?.!")}
+
+
+# (pattern, tool name, args builder) checked in order against the user's message;
+# messages matching nothing go to retrieve_jobs.
+DEFAULT_TOOL_SCRIPT = [
+    (r"\b(?:compare|vs\.?|versus)\b", "compare_jobs_tool", _split_titles),
+    (r"\bcareer\b|\bgrowth\b|\bpromot", "summarize_career_tool", lambda query, match: {"query": query}),
+    (r"\b(?:all|every|list)\b.*\b(?:jobs|positions|openings|roles)\b", "list_all_jobs", lambda query, match: {}),
+    (r"\b(?:in|at|near)\s+([A-Z][\w ]+?)(?:\?|\.|$)", "location_filter_tool", _location),
+]
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that answers from a script instead of calling Gemini.
+
+    A user message bound to tools produces one scripted tool call; a tool
+    result produces a final answer quoting the first lines of the results.
+    """
+
+    model: str = "fake-chat"
+    latency_ms: float = FAKE_LLM_LATENCY_MS
+    script: List[Any] = DEFAULT_TOOL_SCRIPT
+    bound_tools: List[str] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(update={"bound_tools": [tool.name for tool in tools]})
+
+    def _tool_call(self, query: str, turn: int):
+        name, args = "retrieve_jobs", {"query": query}
+        for pattern, tool_name, build_args in self.script:
+            match = re.search(pattern, query, flags=re.IGNORECASE)
+            if match and tool_name in self.bound_tools:
+                name, args = tool_name, build_args(query, match)
+                break
+        # The id must differ between turns of one thread, or the tools node skips it.
+        call_id = "call_" + hashlib.sha1(f"{turn}:{name}:{query}".encode()).hexdigest()[:12]
+        return {"name": name, "args": args, "id": call_id, "type": "tool_call"}
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        _wait(self.latency_ms)
+        return self._respond(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await _await(self.latency_ms)
+        return self._respond(messages)
+
+    def _respond(self, messages) -> ChatResult:
+        last = messages[-1]
+        if isinstance(last, HumanMessage) and self.bound_tools:
+            message = AIMessage(content="", tool_calls=[self._tool_call(str(last.content), len(messages))])
+        elif isinstance(last, ToolMessage):
+            results = []
+            for message in reversed(messages):
+                if not isinstance(message, ToolMessage):
+                    break
+                results.extend(line for line in str(message.content).splitlines() if line.strip())
+            body = "\n".join(f"- {line[:120]}" for line in results[:FAKE_ANSWER_LINES])
+            message = AIMessage(content=f"Here is what I found:\n{body or '- No matching positions.'}")
+        else:
+            message = AIMessage(content=f"You asked: {str(last.content)[:200]}")
+
+        prompt_tokens = sum(_tokens(str(m.content)) for m in messages)
+        message.usage_metadata = {
+            "input_tokens": prompt_tokens,
+            "output_tokens": _tokens(message.content),
+            "total_tokens": prompt_tokens + _tokens(message.content),
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class FakeGenerativeModel:
+    """Stand-in for genai.GenerativeModel.generate_content."""
+
+    def __init__(self, model_name: str = "fake-generative", latency_ms: float = FAKE_LLM_LATENCY_MS):
+        self.model_name = model_name
+        self.latency_ms = latency_ms
+
+    def generate_content(self, prompt, **kwargs):
+        _wait(self.latency_ms)
+        return self._respond(prompt)
+
+    async def generate_content_async(self, prompt, **kwargs):
+        await _await(self.latency_ms)
+        return self._respond(prompt)
+
+    def _respond(self, prompt):
+        prompt = str(prompt)
+        lines = [line.strip() for line in prompt.splitlines() if line.strip()]
+        text = "Summary:\n" + "\n".join(f"- {line[:120]}" for line in lines[:FAKE_ANSWER_LINES])
+        return SimpleNamespace(
+            text=text,
+            usage_metadata=SimpleNamespace(prompt_token_count=_tokens(prompt), candidates_token_count=_tokens(text))
+        )
+
+
+class FakeEmbeddings(Embeddings):
+    """Hashed bag-of-words embeddings: texts sharing words get similar vectors."""
+
+    def __init__(self, model: str = "fake-embedding", latency_ms: float = FAKE_EMBED_LATENCY_MS,
+                 dimensions: int = FAKE_EMBEDDING_DIMENSIONS):
+        self.model = model
+        self.latency_ms = latency_ms
+        self.dimensions = dimensions
+
+    def _vector(self, text: str):
+        vector = [0.0] * self.dimensions
+        for word in _WORD_PATTERN.findall((text or "").lower()):
+            digest = hashlib.md5(word.encode()).digest()
+            vector[int.from_bytes(digest[:4], "little") % self.dimensions] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def embed_documents(self, texts, task_type: str = None):
+        _wait(self.latency_ms)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str):
+        _wait(self.latency_ms)
+        return self._vector(text)
+
+    async def aembed_documents(self, texts):
+        await _await(self.latency_ms)
+        return [self._vector(text) for text in texts]
+
+    async def aembed_query(self, text: str):
+        await _await(self.latency_ms)
+        return self._vector(text)
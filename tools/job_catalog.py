@@ -0,0 +1,90 @@
+import difflib
+import hashlib
+import json
+import math
+import re
+
+TITLE_MATCH_CUTOFF = 0.75
+
+
+def render_job_content(job: dict) -> str:
+    """Render a job posting as the text stored in the vector database."""
+    return f"""Title: {job.get('title', '')}
+Location: {job.get('location', '')}
+job_url: {job.get('job_url', '')}
+Department: {job.get('department', '')}
+Type: {job.get('job_type', '')}
+Workplace Type: {job.get('workplace_type', '')}
+Job URL: {job.get('job_url', '')}
+Summary: {job.get('job_summary', '')}
+Responsibilities: {job.get('key_responsibilities', '')}
+Requirements: {job.get('requirements', '')}"""
+
+
+def render_job_summary(job: dict) -> str:
+    """Render a one-line summary of a job posting."""
+    return (
+        f"{job.get('title', 'Untitled')} | {job.get('location', 'Not specified')} | "
+        f"{job.get('department', 'Not specified')} | {job.get('job_type', 'Not specified')} | "
+        f"{job.get('workplace_type', 'Not specified')} | {job.get('job_url', '')}"
+    )
+
+
+def normalize_title(title: str) -> str:
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", (title or "").lower()).split())
+
+
+class JobCatalog:
+    """Structured, in-memory view of the scraped jobs, ordered by job_id."""
+
+    def __init__(self, jobs):
+        self._by_id = {}
+        for job in jobs:
+            job_id = job.get("job_id")
+            if job_id and job_id not in self._by_id:
+                self._by_id[job_id] = job
+        self.jobs = sorted(self._by_id.values(), key=lambda job: job["job_id"])
+        self.version = hashlib.sha256(
+            json.dumps(self.jobs, sort_keys=True).encode("utf-8")
+        ).hexdigest()[:16]
+
+    @classmethod
+    def from_json(cls, json_path):
+        with open(json_path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def __iter__(self):
+        return iter(self.jobs)
+
+    def __contains__(self, job_id):
+        return job_id in self._by_id
+
+    def get(self, job_id):
+        return self._by_id.get(job_id)
+
+    def job_ids(self):
+        return set(self._by_id)
+
+    def find_by_title(self, title: str, cutoff: float = TITLE_MATCH_CUTOFF):
+        """Return the postings whose title matches exactly (ignoring case and punctuation), else the closest title."""
+        wanted = normalize_title(title)
+        if not wanted:
+            return []
+        by_title = {}
+        for job in self.jobs:
+            by_title.setdefault(normalize_title(job.get("title", "")), []).append(job)
+        if wanted in by_title:
+            return by_title[wanted]
+        close = difflib.get_close_matches(wanted, by_title, n=1, cutoff=cutoff)
+        return by_title[close[0]] if close else []
+
+    def page(self, page: int = 1, page_size: int = 20):
+        """Return the jobs on a 1-based page and the total number of pages."""
+        page_size = max(1, page_size)
+        total_pages = max(1, math.ceil(len(self.jobs) / page_size))
+        page = min(max(1, page), total_pages)
+        start = (page - 1) * page_size
+        return self.jobs[start:start + page_size], total_pages
@@ -0,0 +1,370 @@
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+from langchain_core.embeddings import Embeddings
+from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
+from tools.fake_llm import FakeChatModel, FakeEmbeddings, FakeGenerativeModel
+from dotenv import load_dotenv
+from contextlib import contextmanager
+import asyncio
+import contextvars
+import os
+import random
+import threading
+import time
+import weakref
+
+load_dotenv()
+
+GEMINI_MODEL = "gemini-2.0-flash"
+EMBEDDING_MODEL = "models/embedding-001"
+
+# "gemini", or "fake" for the deterministic offline clients in tools/fake_llm.py.
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini").lower()
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+# Awaiting calls hold no thread, so the async path allows more calls in flight.
+LLM_MAX_ASYNC_CONCURRENCY = int(os.getenv("LLM_MAX_ASYNC_CONCURRENCY", "64"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_BASE_BACKOFF = 1.0
+LLM_MAX_BACKOFF = 30.0
+
+# USD per million tokens, used for the estimated cost in usage summaries.
+LLM_INPUT_PRICE_PER_MILLION = float(os.getenv("LLM_INPUT_PRICE_PER_MILLION", "0.10"))
+LLM_OUTPUT_PRICE_PER_MILLION = float(os.getenv("LLM_OUTPUT_PRICE_PER_MILLION", "0.40"))
+
+RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+_usage_recorders = contextvars.ContextVar("usage_recorders", default=())
+_usage_source = contextvars.ContextVar("usage_source", default=None)
+
+
+def is_retryable(error: Exception) -> bool:
+    """Transient API errors, including ones wrapped by the LangChain client."""
+    return isinstance(error, RETRYABLE_ERRORS) or isinstance(error.__cause__, RETRYABLE_ERRORS)
+
+
+class LLMGateway:
+    """Single entry point for Gemini calls in this process.
+
+    Holds long-lived clients (configured once, reused across requests), caps
+    concurrent calls with a semaphore, retries transient errors with
+    exponential backoff and jitter, and records per-operation latency and
+    token counts.
+    """
+
+    def __init__(self, api_key: str = None, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 max_async_concurrency: int = LLM_MAX_ASYNC_CONCURRENCY,
+                 max_retries: int = LLM_MAX_RETRIES, backend: str = LLM_BACKEND):
+        self.api_key = api_key
+        self.backend = backend
+        self.max_retries = max(0, max_retries)
+        self.max_async_concurrency = max_async_concurrency
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._async_semaphores = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._configured = False
+        self._generative_models = {}
+        self._chat_models = {}
+        self._embedding_clients = {}
+        self._embeddings = {}
+        self._stats = {}
+
+    def _api_key(self):
+        return self.api_key or os.getenv("GOOGLE_API_KEY")
+
+    def generative_model(self, model: str = GEMINI_MODEL):
+        with self._lock:
+            if self.backend == "fake":
+                return self._generative_models.setdefault(model, FakeGenerativeModel(model))
+            if not self._configured:
+                genai.configure(api_key=self._api_key())
+                self._configured = True
+            if model not in self._generative_models:
+                self._generative_models[model] = genai.GenerativeModel(model)
+            return self._generative_models[model]
+
+    def chat_model(self, model: str = GEMINI_MODEL, temperature: float = 0, tools=None):
+        """Return the shared chat client, bound to tools when given."""
+        with self._lock:
+            key = (model, temperature)
+            if key not in self._chat_models and self.backend == "fake":
+                self._chat_models[key] = FakeChatModel(model=model)
+            if key not in self._chat_models:
+                # Retries happen in call(), so the client makes a single attempt.
+                self._chat_models[key] = ChatGoogleGenerativeAI(
+                    model=model,
+                    google_api_key=self._api_key(),
+                    temperature=temperature,
+                    max_retries=1
+                )
+            if not tools:
+                return self._chat_models[key]
+            bound_key = key + tuple(t.name for t in tools)
+            if bound_key not in self._chat_models:
+                self._chat_models[bound_key] = self._chat_models[key].bind_tools(tools)
+            return self._chat_models[bound_key]
+
+    def embeddings(self, model: str = EMBEDDING_MODEL):
+        """Return an embeddings adapter whose requests go through the gateway."""
+        with self._lock:
+            if model not in self._embeddings:
+                self._embeddings[model] = GatewayEmbeddings(self, model)
+            return self._embeddings[model]
+
+    def embedding_client(self, model: str = EMBEDDING_MODEL):
+        with self._lock:
+            if model not in self._embedding_clients and self.backend == "fake":
+                self._embedding_clients[model] = FakeEmbeddings(model=model)
+            if model not in self._embedding_clients:
+                self._embedding_clients[model] = GoogleGenerativeAIEmbeddings(
+                    model=model, google_api_key=self._api_key()
+                )
+            return self._embedding_clients[model]
+
+    def reset_clients(self):
+        """Drop every API client so the next call creates fresh ones (e.g. in a forked worker)."""
+        with self._lock:
+            self._configured = False
+            self._generative_models.clear()
+            self._chat_models.clear()
+            self._embedding_clients.clear()
+
+    def call(self, operation: str, fn, *args, usage=None, **kwargs):
+        """Run fn under the concurrency limit, retrying transient errors.
+
+        usage, if given, maps the result to (input_tokens, output_tokens).
+        The first attempt is followed by up to max_retries retries.
+        """
+        error = None
+        for attempt in range(self.max_retries + 1):
+            started = time.monotonic()
+            try:
+                with self._semaphore:
+                    result = fn(*args, **kwargs)
+            except Exception as e:
+                error = e
+                delay = self._retry_delay(operation, attempt, e, time.monotonic() - started)
+                time.sleep(delay)
+                continue
+            tokens = usage(result) if usage else (0, 0)
+            self._record(operation, time.monotonic() - started, tokens=tokens)
+            return result
+        raise error
+
+    async def acall(self, operation: str, fn, *args, usage=None, **kwargs):
+        """Async counterpart of call(): awaits fn(*args, **kwargs) without blocking the event loop."""
+        error = None
+        for attempt in range(self.max_retries + 1):
+            started = time.monotonic()
+            try:
+                async with self._async_semaphore():
+                    result = await fn(*args, **kwargs)
+            except Exception as e:
+                error = e
+                delay = self._retry_delay(operation, attempt, e, time.monotonic() - started)
+                await asyncio.sleep(delay)
+                continue
+            tokens = usage(result) if usage else (0, 0)
+            self._record(operation, time.monotonic() - started, tokens=tokens)
+            return result
+        raise error
+
+    def _retry_delay(self, operation: str, attempt: int, error: Exception, latency: float) -> float:
+        """Record a failed attempt and return the backoff before the next one; re-raises when out of retries."""
+        self._record(operation, latency, failed=True)
+        if not is_retryable(error) or attempt >= self.max_retries:
+            raise error
+        delay = min(LLM_MAX_BACKOFF, LLM_BASE_BACKOFF * 2 ** attempt) * (0.5 + random.random() / 2)
+        print(f"{operation} failed ({error}), retrying in {delay:.1f}s")
+        self._record(operation, 0.0, retried=True)
+        return delay
+
+    def _async_semaphore(self) -> asyncio.Semaphore:
+        # asyncio primitives belong to one event loop, so each loop gets its own limit.
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphore = self._async_semaphores.get(loop)
+            if semaphore is None:
+                semaphore = self._async_semaphores[loop] = asyncio.Semaphore(self.max_async_concurrency)
+            return semaphore
+
+    def generate(self, prompt: str, model: str = GEMINI_MODEL, **kwargs) -> str:
+        """Generate text from a prompt with a shared GenerativeModel."""
+        response = self.call(
+            "generate_content",
+            self.generative_model(model).generate_content,
+            prompt,
+            usage=_generate_content_usage,
+            **kwargs
+        )
+        return response.text
+
+    async def agenerate(self, prompt: str, model: str = GEMINI_MODEL, **kwargs) -> str:
+        response = await self.acall(
+            "generate_content",
+            self.generative_model(model).generate_content_async,
+            prompt,
+            usage=_generate_content_usage,
+            **kwargs
+        )
+        return response.text
+
+    def invoke_chat(self, chat_model, messages):
+        """Invoke a (possibly tool-bound) chat model with the gateway's limits and accounting."""
+        return self.call("chat", chat_model.invoke, messages, usage=_chat_usage)
+
+    async def ainvoke_chat(self, chat_model, messages):
+        return await self.acall("chat", chat_model.ainvoke, messages, usage=_chat_usage)
+
+    def _record(self, operation: str, latency: float, tokens=(0, 0), failed: bool = False, retried: bool = False):
+        for recorder in _usage_recorders.get():
+            recorder.record(operation, _usage_source.get(), latency, tokens, failed, retried)
+        with self._lock:
+            stats = self._stats.setdefault(operation, {
+                "calls": 0, "failures": 0, "retries": 0,
+                "total_latency": 0.0, "max_latency": 0.0,
+                "input_tokens": 0, "output_tokens": 0
+            })
+            if retried:
+                stats["retries"] += 1
+                return
+            stats["calls"] += 1
+            stats["failures"] += int(failed)
+            stats["total_latency"] += latency
+            stats["max_latency"] = max(stats["max_latency"], latency)
+            stats["input_tokens"] += tokens[0] or 0
+            stats["output_tokens"] += tokens[1] or 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                operation: {
+                    **{key: value for key, value in stats.items() if key != "total_latency"},
+                    "avg_latency": round(stats["total_latency"] / stats["calls"], 4) if stats["calls"] else 0.0,
+                    "max_latency": round(stats["max_latency"], 4)
+                }
+                for operation, stats in self._stats.items()
+            }
+
+
+class UsageRecorder:
+    """Calls, retries, tokens and latency of the gateway calls made in its context.
+
+    Calls are grouped by operation and by source (the usage_source() active
+    when the call was made). Recorders nest: a call counts towards every
+    recorder active in the context it runs in.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._operations = {}
+        self._sources = {}
+
+    def record(self, operation: str, source: str, latency: float, tokens=(0, 0),
+               failed: bool = False, retried: bool = False):
+        with self._lock:
+            for groups, key in ((self._operations, operation), (self._sources, source or "other")):
+                entry = groups.setdefault(key, {
+                    "calls": 0, "retries": 0, "failures": 0,
+                    "input_tokens": 0, "output_tokens": 0, "latency_seconds": 0.0
+                })
+                if retried:
+                    entry["retries"] += 1
+                    continue
+                entry["calls"] += 1
+                entry["failures"] += int(failed)
+                entry["input_tokens"] += tokens[0] or 0
+                entry["output_tokens"] += tokens[1] or 0
+                entry["latency_seconds"] += latency
+
+    def summary(self) -> dict:
+        with self._lock:
+            operations = {key: dict(entry) for key, entry in self._operations.items()}
+            sources = {key: dict(entry) for key, entry in self._sources.items()}
+        totals = {
+            field: sum(entry[field] for entry in operations.values())
+            for field in ("calls", "retries", "failures", "input_tokens", "output_tokens", "latency_seconds")
+        }
+        for entry in (totals, *operations.values(), *sources.values()):
+            entry["latency_seconds"] = round(entry["latency_seconds"], 4)
+        totals["estimated_cost_usd"] = estimate_cost(totals["input_tokens"], totals["output_tokens"])
+        return {**totals, "by_operation": operations, "by_source": sources}
+
+
+def estimate_cost(input_tokens: int, output_tokens: int) -> float:
+    return round(
+        (input_tokens * LLM_INPUT_PRICE_PER_MILLION + output_tokens * LLM_OUTPUT_PRICE_PER_MILLION) / 1_000_000, 6
+    )
+
+
+@contextmanager
+def track_usage():
+    """Record the gateway calls made in this context (and contexts copied from it)."""
+    recorder = UsageRecorder()
+    token = _usage_recorders.set(_usage_recorders.get() + (recorder,))
+    try:
+        yield recorder
+    finally:
+        _usage_recorders.reset(token)
+
+
+@contextmanager
+def usage_source(name: str):
+    """Attribute the gateway calls made in this context to name."""
+    token = _usage_source.set(name)
+    try:
+        yield
+    finally:
+        _usage_source.reset(token)
+
+
+class GatewayEmbeddings(Embeddings):
+    """Embeddings client whose requests go through the gateway."""
+
+    def __init__(self, gateway: LLMGateway, model_name: str):
+        self.gateway = gateway
+        self.model_name = model_name
+
+    def embed_query(self, text: str):
+        client = self.gateway.embedding_client(self.model_name)
+        return self.gateway.call("embed_query", client.embed_query, text)
+
+    def embed_documents(self, texts, task_type: str = None):
+        client = self.gateway.embedding_client(self.model_name)
+        kwargs = {"task_type": task_type} if task_type else {}
+        return self.gateway.call("embed_documents", client.embed_documents, texts, **kwargs)
+
+    async def aembed_query(self, text: str):
+        client = self.gateway.embedding_client(self.model_name)
+        return await self.gateway.acall("embed_query", client.aembed_query, text)
+
+    async def aembed_documents(self, texts, task_type: str = None):
+        client = self.gateway.embedding_client(self.model_name)
+        if task_type:
+            # The client's async batch call takes no task type; run the sync one on a thread.
+            return await self.gateway.acall(
+                "embed_documents", asyncio.to_thread, client.embed_documents, texts, task_type=task_type
+            )
+        return await self.gateway.acall("embed_documents", client.aembed_documents, texts)
+
+
+def _generate_content_usage(response):
+    metadata = getattr(response, "usage_metadata", None)
+    if metadata is None:
+        return 0, 0
+    return getattr(metadata, "prompt_token_count", 0), getattr(metadata, "candidates_token_count", 0)
+
+
+def _chat_usage(message):
+    metadata = getattr(message, "usage_metadata", None) or {}
+    return metadata.get("input_tokens", 0), metadata.get("output_tokens", 0)
+
+
+gateway = LLMGateway()
@@ -1,30 +1,162 @@
-import google.generativeai as genai
-import os
-
-def filter_by_location(jobs_info: str, location: str):
-    """Filter jobs by specified location using Gemini API."""
-    
-    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-    
-    model = genai.GenerativeModel('gemini-2.0-flash')
-    
-    prompt = f"""Filter and analyze these jobs by location. Return only jobs that are in or near: {location}
-
-Jobs Information:
-{jobs_info}
-
-For each matching job, provide:
-- Job Title
-- Exact Location
-- Brief job summary
-- Department
-- Job Type (Full-time, Part-time, etc.)
-
-If no exact matches, suggest similar locations or nearby areas.
-Format the response clearly with job titles as headers."""
-    
-    try:
-        response = model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        return f"Error filtering jobs by location: {str(e)}"
\ No newline at end of file
+import difflib
+import re
+import unicodedata
+from tools.job_catalog import render_job_summary
+
+FUZZY_MATCH_CUTOFF = 0.8
+# Longest place name, in words, looked for inside a location string.
+MAX_PLACE_WORDS = 3
+# Shorter words are only matched exactly, never fuzzily.
+MIN_FUZZY_LENGTH = 4
+
+# Words that qualify a place name without changing which place it is.
+PLACE_QUALIFIERS = {"governorate", "province", "city", "state", "region", "emirate", "capital", "territory"}
+
+# Alternative spellings and transliterations mapped to one canonical name.
+LOCATION_ALIASES = {
+    "al qahirah": "cairo",
+    "el qahira": "cairo",
+    "al qahira": "cairo",
+    "al jizah": "giza",
+    "el giza": "giza",
+    "al giza": "giza",
+    "6 october": "6th of october",
+    "6th october": "6th of october",
+    "sixth of october": "6th of october",
+    "october": "6th of october",
+    "ad daqahliyah": "dakahlia",
+    "daqahlia": "dakahlia",
+    "dakahlyia": "dakahlia",
+    "el omraniya": "omraniya",
+    "al omraniya": "omraniya",
+    "makkah": "mecca",
+    "ksa": "saudi arabia",
+    "saudi": "saudi arabia",
+    "uae": "united arab emirates",
+    "emirates": "united arab emirates",
+    "alex": "alexandria",
+    "federal": "abuja",
+    "fct": "abuja",
+}
+
+_QUERY_SEPARATORS = re.compile(r"\s+(?:or|and)\s+|/|&|;")
+
+
+def normalize_place(name: str) -> str:
+    """Lowercase, strip accents, punctuation and qualifiers, then resolve aliases."""
+    text = unicodedata.normalize("NFKD", name or "")
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r"\(.*?\)", " ", text.lower())
+    text = re.sub(r"[^a-z0-9 ]+", " ", text)
+    words = [word for word in text.split() if word not in PLACE_QUALIFIERS]
+    text = " ".join(words)
+    return LOCATION_ALIASES.get(text, text)
+
+
+def location_key(term: str) -> str:
+    """Metadata key flagging that a job is located in the given normalized place."""
+    return "loc_" + term.replace(" ", "_")
+
+
+def location_terms(location: str) -> set:
+    """Normalized place names mentioned in a job's location field."""
+    return {term for term in (normalize_place(part) for part in (location or "").split(",")) if term}
+
+
+class LocationIndex:
+    """Maps normalized city, governorate and country names to the jobs located there."""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self._jobs_by_term = {}
+        for job in catalog:
+            for term in location_terms(job.get("location", "")):
+                self._jobs_by_term.setdefault(term, []).append(job)
+
+    def terms(self):
+        return sorted(self._jobs_by_term)
+
+    def _lookup(self, phrase: str):
+        """Indexed term for a phrase: exact or alias, then fuzzy against terms of the same length."""
+        phrase = LOCATION_ALIASES.get(phrase, phrase)
+        if phrase in self._jobs_by_term:
+            return phrase
+        if len(phrase) < MIN_FUZZY_LENGTH:
+            return None
+        same_length = [term for term in self._jobs_by_term if len(term.split()) == len(phrase.split())]
+        close = difflib.get_close_matches(phrase, same_length, n=1, cutoff=FUZZY_MATCH_CUTOFF)
+        return close[0] if close else None
+
+    def resolve(self, name: str) -> list:
+        """Indexed terms named in a place string, e.g. "Dubai UAE" -> dubai, united arab emirates.
+
+        The whole string is tried first; otherwise its words are scanned for
+        known places, longest phrases first, so unknown words such as a
+        district ("New Cairo", "Maadi") are skipped.
+        """
+        text = normalize_place(name)
+        if not text:
+            return []
+        whole = self._lookup(text)
+        if whole:
+            return [whole]
+        words = text.split()
+        covered = [False] * len(words)
+        found = []
+        for size in range(min(MAX_PLACE_WORDS, len(words)), 0, -1):
+            for start in range(len(words) - size + 1):
+                if any(covered[start:start + size]):
+                    continue
+                term = self._lookup(" ".join(words[start:start + size]))
+                if term:
+                    found.append((start, term))
+                    covered[start:start + size] = [True] * size
+        return list(dict.fromkeys(term for _, term in sorted(found)))
+
+    def query_terms(self, location: str) -> list:
+        """Parse a location query into alternatives, each a list of terms that must all match.
+
+        Alternatives are joined by "or", "and" or "/"; the places named in
+        one alternative (e.g. "Cairo, Egypt" or "cairo egypt") must all
+        match. Parts naming no known place are ignored, and alternatives
+        with no known place at all are dropped.
+        """
+        alternatives = []
+        for alternative in _QUERY_SEPARATORS.split(location or ""):
+            terms = [term for part in alternative.split(",") for term in self.resolve(part)]
+            if terms:
+                alternatives.append(list(dict.fromkeys(terms)))
+        return alternatives
+
+    def job_ids(self, alternatives) -> set:
+        """Ids of jobs matching any alternative returned by query_terms."""
+        job_ids = set()
+        for terms in alternatives:
+            job_ids |= set.intersection(*({job["job_id"] for job in self._jobs_by_term[term]} for term in terms))
+        return job_ids
+
+    def match(self, location: str):
+        """Return (matched terms, jobs) for a location query."""
+        alternatives = self.query_terms(location)
+        matched_terms = list(dict.fromkeys(term for terms in alternatives for term in terms))
+        jobs = [self.catalog.get(job_id) for job_id in self.job_ids(alternatives)]
+        return matched_terms, sorted(jobs, key=lambda job: job["job_id"])
+
+    def location_counts(self):
+        """Number of jobs per distinct location field, most common first."""
+        counts = {}
+        for job in self.catalog:
+            counts[job.get("location", "")] = counts.get(job.get("location", ""), 0) + 1
+        return sorted(counts.items(), key=lambda item: -item[1])
+
+
+def filter_by_location(index: LocationIndex, location: str) -> str:
+    """List every job in the requested location, or the locations with openings if none match."""
+    matched_terms, jobs = index.match(location)
+    if not jobs:
+        available = "\n".join(f"- {name} ({count})" for name, count in index.location_counts())
+        return f"No open positions found in '{location}'. Locations with open positions:\n{available}"
+
+    lines = [f"Found {len(jobs)} open positions in '{location}' (matched: {', '.join(matched_terms)}):"]
+    lines.extend(f"- {render_job_summary(job)}" for job in jobs)
+    return "\n".join(lines)
@@ -1,78 +1,624 @@
 from langchain_community.vectorstores import Chroma
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain_core.documents import Document
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+import asyncio
+import atexit
+import difflib
+import hashlib
 import json
 import os
 import shutil
+import threading
+import time
+import uuid
+try:
+    import fcntl
+except ImportError:  # Windows: builds are not serialized across processes
+    fcntl = None
 from dotenv import load_dotenv
+from tools.job_catalog import JobCatalog, render_job_content
+from tools.embedding_cache import CachedEmbeddings
+from tools.llm_gateway import gateway, EMBEDDING_MODEL
+from tools.location_filter import LocationIndex, location_key, location_terms
+from tools.bm25 import BM25Index, reciprocal_rank_fusion
+from tools.signatures import (
+    minhash_signature, encode_signature, decode_signature, select_distinct, find_near_duplicates
+)
+import numpy as np
 
 load_dotenv()
 
+INDEX_SCHEMA_VERSION = 4
+QUERY_DUPLICATE_THRESHOLD = 0.8
+RRF_K = 60
+INDEX_DUPLICATE_THRESHOLD = 0.9
+
+EMBEDDINGS_DIR = "data/embeddings"
+CHROMA_DIR = os.path.join(EMBEDDINGS_DIR, "chroma_db")
+STAGING_PREFIX = "chroma_db.staging-"
+BUILD_MANIFEST = "build_manifest.json"
+BUILD_LOCK = os.path.join(EMBEDDINGS_DIR, "build.lock")
+# One empty file per (generation, pid) a process has open; old generations
+# are only deleted once no live process holds a lease on them.
+LEASES_DIR = os.path.join(EMBEDDINGS_DIR, "leases")
+# Rewritten by every sync and rebuild; running processes compare it on each
+# query to pick up changes made by another process.
+INDEX_MARKER = os.path.join(EMBEDDINGS_DIR, "index_version.json")
+KEPT_GENERATIONS = 2
+
+EMBED_BATCH_SIZE = 32
+EMBED_MAX_WORKERS = 4
+
+# Structured job fields stored as vector metadata and accepted as retrieve() filters.
+FILTER_FIELDS = ("department", "job_type", "workplace_type")
+FILTER_MATCH_CUTOFF = 0.8
+
+
+def _process_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # os.kill cannot probe a process on Windows; treat every lease as live.
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _remove_file(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def leased_generations() -> set:
+    """Generation directory names that a live process still has open; stale leases are removed."""
+    if not os.path.isdir(LEASES_DIR):
+        return set()
+    leased = set()
+    for entry in os.listdir(LEASES_DIR):
+        generation, _, pid = entry.rpartition(".")
+        if pid.isdigit() and _process_alive(int(pid)):
+            leased.add(generation)
+        else:
+            _remove_file(os.path.join(LEASES_DIR, entry))
+    return leased
+
+
+def write_index_marker() -> str:
+    """Record a new index version for other processes to notice; returns it."""
+    version = uuid.uuid4().hex
+    with open(INDEX_MARKER + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"version": version, "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S")}, f)
+    os.replace(INDEX_MARKER + ".tmp", INDEX_MARKER)
+    return version
+
+
+def _marker_stamp():
+    try:
+        stat = os.stat(INDEX_MARKER)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def _read_marker():
+    """(stamp, version) of the index marker; version is "" before the first sync or rebuild."""
+    stamp = _marker_stamp()
+    try:
+        with open(INDEX_MARKER, "r", encoding="utf-8") as f:
+            return stamp, json.load(f).get("version", "")
+    except (OSError, ValueError):
+        return stamp, ""
+
+
+def _normalize_value(value: str) -> str:
+    return " ".join("".join(char if char.isalnum() else " " for char in (value or "").lower()).split())
+
 class JobRetriever:
-    def __init__(self, json_path="data/jobs.json", rebuild_db=False):
-        self.embedding_model = GoogleGenerativeAIEmbeddings(
-            model="models/embedding-001",
-            google_api_key=os.getenv("GOOGLE_API_KEY")
+    def __init__(self, json_path="data/jobs.json", rebuild_db=False, sync_db=False):
+        self.json_path = json_path
+        self._refresh_lock = threading.Lock()
+        self.embedding_model = CachedEmbeddings(
+            gateway.embeddings(EMBEDDING_MODEL),
+            model_name=EMBEDDING_MODEL
         )
-        if rebuild_db or not os.path.exists("data/embeddings/chroma_db"): 
-            self.db = self._initialize_db(json_path)
+        self.catalog = JobCatalog.from_json(json_path)
+        self.locations = LocationIndex(self.catalog)
+        self.bm25 = BM25Index(self.catalog)
+        if rebuild_db or not os.path.exists(CHROMA_DIR): 
+            self.db = self._initialize_db(json_path, force=rebuild_db)
         else:
-            self.db = Chroma(
-                persist_directory="data/embeddings/chroma_db",
-                embedding_function=self.embedding_model
-            )
+            self.db = self._open_db(CHROMA_DIR)
+            if not self._index_is_current(self.db):
+                print("Vector index schema is outdated, rebuilding...")
+                self.db = self._initialize_db(json_path)
+            elif sync_db:
+                self.sync(json_path)
+            else:
+                self._check_catalog_sync()
+        self._marker_stamp, self._marker = _read_marker()
+
+    @property
+    def index_version(self):
+        """Identifies the job data, index generation and last sync currently being served."""
+        return f"{INDEX_SCHEMA_VERSION}:{self.catalog.version}:{self.generation}:{self._marker}"
+
+    def refresh(self) -> bool:
+        """Reload after another process synced or rebuilt the index.
+
+        Costs one stat() when nothing changed. Otherwise the job catalog,
+        BM25 and location indexes are rebuilt from json_path and the vector
+        store is reopened; index_version changes with them, which starts a
+        new response cache generation. Returns whether anything was reloaded.
+        """
+        if _marker_stamp() == self._marker_stamp:
+            return False
+        with self._refresh_lock:
+            stamp, marker = _read_marker()
+            if stamp == self._marker_stamp:
+                return False
+            from chromadb.api.client import SharedSystemClient
+
+            catalog = JobCatalog.from_json(self.json_path)
+            locations, bm25 = LocationIndex(catalog), BM25Index(catalog)
+            # Chroma keeps one client per path; drop it so changes written
+            # by the other process are read from disk.
+            SharedSystemClient.clear_system_cache()
+            self.db = self._open_db(CHROMA_DIR)
+            self.catalog, self.locations, self.bm25 = catalog, locations, bm25
+            self._marker_stamp, self._marker = stamp, marker
+            print(f"Reloaded {len(catalog)} jobs after an index update ({self.generation})")
+            return True
+
+    @staticmethod
+    @contextmanager
+    def _build_lock():
+        """Hold the exclusive index build lock, waiting for any other process's build or sync."""
+        os.makedirs(EMBEDDINGS_DIR, exist_ok=True)
+        with open(BUILD_LOCK, "a") as lock_file:
+            if fcntl is None:
+                yield
+                return
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                print("Waiting for another process to finish building the vector index...")
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _open_db(self, path):
+        # Open the resolved generation directory so a later swap of the
+        # chroma_db link never hands out a cached client for the old index.
+        generation_dir = os.path.realpath(path)
+        self._lease(generation_dir)
+        self.generation = os.path.basename(generation_dir)
+        db = Chroma(
+            persist_directory=generation_dir,
+            embedding_function=self.embedding_model
+        )
+        # Read once per open so BM25 filtering needs no per-query lookup.
+        self.duplicate_ids = set(db.get(where={"is_duplicate": True}, include=[])["ids"])
+        return db
+
+    def _lease(self, generation_dir):
+        """Record that this process has generation_dir open, so builds elsewhere keep it."""
+        os.makedirs(LEASES_DIR, exist_ok=True)
+        lease = os.path.join(LEASES_DIR, f"{os.path.basename(generation_dir)}.{os.getpid()}")
+        previous = getattr(self, "_lease_path", None)
+        if lease == previous:
+            return
+        open(lease, "a").close()
+        atexit.register(_remove_file, lease)
+        # A lease inherited from a preloading parent belongs to the parent.
+        if previous and previous.endswith(f".{os.getpid()}"):
+            _remove_file(previous)
+        self._lease_path = lease
+
+    def _build_documents(self):
+        jobs = list(self.catalog)
+        contents = [render_job_content(job) for job in jobs]
+        signatures = np.array([minhash_signature(content) for content in contents])
+        duplicates = find_near_duplicates(
+            signatures,
+            [job.get("title", "").strip().lower() for job in jobs],
+            INDEX_DUPLICATE_THRESHOLD
+        )
+        if duplicates:
+            print(f"Flagged {len(duplicates)} near-duplicate postings")
         
-    def _initialize_db(self, json_path):
-        if os.path.exists("data/embeddings/chroma_db"):
-            shutil.rmtree("data/embeddings/chroma_db")
-            
-        if not os.path.exists("data/embeddings"):
-            os.makedirs("data/embeddings")
-            
-        with open(json_path, 'r', encoding='utf-8') as f:
-            jobs = json.load(f)
-            
         docs = []
-        for job in jobs:
-            content = f"""Title: {job['title']}
-Location: {job['location']}
-job_url: {job['job_url']}
-Department: {job['department']}
-Type: {job['job_type']}
-Workplace Type: {job['workplace_type']}
-Job URL: {job['job_url']}
-Summary: {job['job_summary']}
-Responsibilities: {job['key_responsibilities']}
-Requirements: {job['requirements']}"""
-            docs.append(Document(page_content=content, metadata={"job_id": job["job_id"]}))
-            
-        db = Chroma.from_documents(
-            docs,
-            self.embedding_model,
-            persist_directory="data/embeddings/chroma_db"
+        for i, (job, content) in enumerate(zip(jobs, contents)):
+            metadata = {
+                "job_id": job["job_id"],
+                "schema_version": INDEX_SCHEMA_VERSION,
+                "content_hash": hashlib.sha256(content.encode("utf-8")).hexdigest(),
+                "signature": encode_signature(signatures[i]),
+                "is_duplicate": i in duplicates,
+                "duplicate_of": jobs[duplicates[i]]["job_id"] if i in duplicates else "",
+                "title": job.get("title") or "",
+                "location": job.get("location") or ""
+            }
+            for field in FILTER_FIELDS:
+                metadata[field] = job.get(field) or ""
+            for term in location_terms(job.get("location", "")):
+                metadata[location_key(term)] = True
+            docs.append(Document(page_content=content, metadata=metadata))
+        return docs
+        
+    def _initialize_db(self, json_path, force=False, batch_size=EMBED_BATCH_SIZE, max_workers=EMBED_MAX_WORKERS):
+        """Build the index into a staging directory in resumable batches, then swap it in.
+
+        The live index stays in place until the new one is complete. Finished
+        batches are recorded in a manifest, so an interrupted build resumes
+        from where it stopped as long as the job data is unchanged. Builds
+        hold the build lock: a process that waited for another one's build
+        uses that index instead of building again, unless force is set.
+        """
+        with self._build_lock():
+            if not force and os.path.exists(CHROMA_DIR):
+                db = self._open_db(CHROMA_DIR)
+                if self._index_is_current(db):
+                    print("Using the vector index built by another process")
+                    return db
+            return self._build_db(batch_size, max_workers)
+
+    def _build_db(self, batch_size, max_workers):
+        docs = self._build_documents()
+        fingerprint = hashlib.sha256(
+            json.dumps([[doc.metadata, doc.page_content] for doc in docs], sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        
+        staging_dir, manifest = self._find_staging(fingerprint)
+        if manifest is None:
+            # Each build stages into a fresh path: Chroma caches clients per
+            # path, so a reused path could resolve to an already promoted build.
+            staging_dir = os.path.join(
+                EMBEDDINGS_DIR, f"{STAGING_PREFIX}{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+            )
+            manifest = {"fingerprint": fingerprint, "batch_size": batch_size, "completed_batches": []}
+            os.makedirs(staging_dir, exist_ok=True)
+            self._save_manifest(staging_dir, manifest)
+        batch_size = manifest["batch_size"]
+        
+        staging = Chroma(persist_directory=staging_dir, embedding_function=self.embedding_model)
+        batches = [docs[i:i + batch_size] for i in range(0, len(docs), batch_size)]
+        completed = set(manifest["completed_batches"])
+        pending = [i for i in range(len(batches)) if i not in completed]
+        if completed:
+            print(f"Resuming index build: {len(completed)}/{len(batches)} batches already embedded")
+        
+        try:
+            for i, embeddings in self._embed_batches(batches, pending, max_workers):
+                self._upsert_batch(staging, batches[i], embeddings)
+                completed.add(i)
+                manifest["completed_batches"] = sorted(completed)
+                self._save_manifest(staging_dir, manifest)
+                print(f"Embedded batch {len(completed)}/{len(batches)} ({len(batches[i])} documents)")
+        except Exception:
+            print(f"Index build interrupted after {len(completed)}/{len(batches)} batches; rerun to resume")
+            raise
+        
+        del staging
+        self._promote_staging(staging_dir)
+        write_index_marker()
+        return self._open_db(CHROMA_DIR)
+
+    def sync(self, json_path="data/jobs.json", batch_size=EMBED_BATCH_SIZE, max_workers=EMBED_MAX_WORKERS):
+        """Bring the live index in line with json_path, embedding only new or changed postings.
+
+        Postings are matched by job_id and compared by the hash of their
+        rendered content. Metadata-only changes (such as duplicate flags) are
+        applied without re-embedding, and postings no longer in the data are
+        deleted. Returns the job_ids in each category.
+        """
+        with self._build_lock():
+            return self._sync(json_path, batch_size, max_workers)
+
+    def _sync(self, json_path, batch_size, max_workers):
+        self.json_path = json_path
+        self.catalog = JobCatalog.from_json(json_path)
+        self.locations = LocationIndex(self.catalog)
+        self.bm25 = BM25Index(self.catalog)
+        docs = self._build_documents()
+        
+        indexed = self.db.get(include=["metadatas"])
+        indexed_metadata = dict(zip(indexed["ids"], indexed["metadatas"]))
+        
+        added, changed, metadata_only = [], [], []
+        for doc in docs:
+            existing = indexed_metadata.get(doc.metadata["job_id"])
+            if existing is None:
+                added.append(doc)
+            elif existing.get("content_hash") != doc.metadata["content_hash"]:
+                changed.append(doc)
+            elif existing != doc.metadata:
+                metadata_only.append(doc)
+        removed = sorted(set(indexed_metadata) - self.catalog.job_ids())
+        
+        to_embed = added + changed
+        batches = [to_embed[i:i + batch_size] for i in range(0, len(to_embed), batch_size)]
+        for i, embeddings in self._embed_batches(batches, range(len(batches)), max_workers):
+            self._upsert_batch(self.db, batches[i], embeddings)
+        
+        if metadata_only:
+            self.db._collection.update(
+                ids=[doc.metadata["job_id"] for doc in metadata_only],
+                metadatas=[doc.metadata for doc in metadata_only]
+            )
+        if removed:
+            self.db._collection.delete(ids=removed)
+        self.duplicate_ids = {doc.metadata["job_id"] for doc in docs if doc.metadata["is_duplicate"]}
+        
+        summary = {
+            "added": [doc.metadata["job_id"] for doc in added],
+            "changed": [doc.metadata["job_id"] for doc in changed],
+            "removed": removed,
+            "unchanged": len(docs) - len(to_embed)
+        }
+        print(
+            f"Index sync: {len(added)} added, {len(changed)} changed, {len(removed)} removed, "
+            f"{summary['unchanged']} unchanged ({len(to_embed)} embedded)"
         )
-        return db
+        self._marker = write_index_marker()
+        self._marker_stamp = _marker_stamp()
+        return summary
+
+    def _embed_batches(self, batches, pending, max_workers):
+        """Embed the pending batches concurrently, yielding (index, embeddings) as they finish."""
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self.embedding_model.embed_documents, [doc.page_content for doc in batches[i]]): i
+                for i in pending
+            }
+            try:
+                for future in as_completed(futures):
+                    yield futures[future], future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
 
-    def _calculate_similarity(self, text1, text2):
-        """Simple similarity check based on common words"""
-        words1 = set(text1.lower().split())
-        words2 = set(text2.lower().split()) 
-        intersection = words1.intersection(words2)
-        union = words1.union(words2)
-        return len(intersection) / len(union) if union else 0
+    def _upsert_batch(self, db, batch, embeddings):
+        db._collection.upsert(
+            ids=[doc.metadata["job_id"] for doc in batch],
+            embeddings=embeddings,
+            metadatas=[doc.metadata for doc in batch],
+            documents=[doc.page_content for doc in batch]
+        )
+
+    def _find_staging(self, fingerprint):
+        """Return a resumable staging build for this data, discarding stale ones.
+
+        Called with the build lock held, so no other process is writing to
+        any staging directory.
+        """
+        found = (None, None)
+        for name in sorted(os.listdir(EMBEDDINGS_DIR)):
+            if not name.startswith(STAGING_PREFIX):
+                continue
+            path = os.path.join(EMBEDDINGS_DIR, name)
+            try:
+                with open(os.path.join(path, BUILD_MANIFEST), 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError):
+                manifest = {}
+            if found[0] is None and manifest.get("fingerprint") == fingerprint:
+                found = (path, manifest)
+            else:
+                shutil.rmtree(path, ignore_errors=True)
+        return found
+
+    def _save_manifest(self, staging_dir, manifest):
+        path = os.path.join(staging_dir, BUILD_MANIFEST)
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(path + ".tmp", path)
+
+    def _promote_staging(self, staging_dir):
+        """Atomically point chroma_db at the finished staging build."""
+        os.remove(os.path.join(staging_dir, BUILD_MANIFEST))
+        generation = os.path.join(
+            EMBEDDINGS_DIR, os.path.basename(staging_dir).replace(STAGING_PREFIX, "chroma_db.gen-", 1)
+        )
+        os.rename(staging_dir, generation)
+        
+        if os.path.isdir(CHROMA_DIR) and not os.path.islink(CHROMA_DIR):
+            # One-time migration from a plain directory to a generation link.
+            legacy = f"{CHROMA_DIR}.gen-legacy"
+            shutil.rmtree(legacy, ignore_errors=True)
+            os.rename(CHROMA_DIR, legacy)
+        
+        link = CHROMA_DIR + ".swap"
+        try:
+            if os.path.lexists(link):
+                os.remove(link)
+            os.symlink(os.path.basename(generation), link)
+            os.replace(link, CHROMA_DIR)
+        except OSError:
+            # Platforms without symlinks fall back to a plain rename.
+            if os.path.islink(CHROMA_DIR):
+                os.remove(CHROMA_DIR)
+            os.rename(generation, CHROMA_DIR)
+            return
         
-    def retrieve(self, query: str, k: int = 5):
-        candidates = self.db.similarity_search_with_score(query, k=k*2)
-        filtered_docs = []
-        for doc, score in candidates:
-            is_similar = False
-            for existing_doc, _ in filtered_docs:
-                if self._calculate_similarity(doc.page_content, existing_doc.page_content) > 0.8:
-                    is_similar = True
-                    break
-            if not is_similar:
-                filtered_docs.append((doc, score))
-            if len(filtered_docs) >= k:
-                break
-                
-        return [doc for doc, _ in filtered_docs]
+        generations = sorted(
+            (path for path in (os.path.join(EMBEDDINGS_DIR, name) for name in os.listdir(EMBEDDINGS_DIR))
+             if os.path.basename(path).startswith(os.path.basename(CHROMA_DIR) + ".gen-")),
+            key=os.path.getmtime,
+            reverse=True
+        )
+        leased = leased_generations()
+        for path in generations[KEPT_GENERATIONS:]:
+            if path != generation and os.path.basename(path) not in leased:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _index_is_current(self, db):
+        """Check that the persisted collection was built with the current metadata schema."""
+        sample = db.get(limit=1, include=["metadatas"])["metadatas"]
+        return bool(sample) and (sample[0] or {}).get("schema_version") == INDEX_SCHEMA_VERSION
+
+    def _check_catalog_sync(self):
+        """Warn when the persisted collection and the job catalog disagree."""
+        indexed = {
+            metadata.get("job_id")
+            for metadata in self.db.get(include=["metadatas"])["metadatas"]
+            if metadata
+        }
+        catalog_ids = self.catalog.job_ids()
+        if indexed != catalog_ids:
+            print(
+                f"Warning: vector index is out of sync with the job catalog "
+                f"({len(catalog_ids - indexed)} missing, {len(indexed - catalog_ids)} stale). "
+                f"Update it with JobRetriever(sync_db=True) or `python -m tools.rag_retriever --sync`."
+            )
+
+    def _resolve_field(self, field: str, value: str) -> list:
+        """Catalog values of a field matching a user-supplied value (case-insensitive, then fuzzy)."""
+        wanted = _normalize_value(value)
+        values = {job.get(field) for job in self.catalog if job.get(field)}
+        by_key = {}
+        for actual in values:
+            by_key.setdefault(_normalize_value(actual), []).append(actual)
+        matches = [
+            actual for key, actuals in by_key.items()
+            if key == wanted or (len(wanted) >= 3 and wanted in key)
+            for actual in actuals
+        ]
+        if not matches:
+            for key in difflib.get_close_matches(wanted, by_key, n=3, cutoff=FILTER_MATCH_CUTOFF):
+                matches.extend(by_key[key])
+        return sorted(matches)
+
+    def build_filter(self, filters: dict = None):
+        """Translate field filters into a Chroma where-clause.
+
+        Returns None when a field filter matches no job in the catalog, so
+        the caller can answer without searching. A location naming no
+        listed place is ignored rather than matching nothing.
+        """
+        plan = self._plan_filters(filters)
+        return plan and plan[0]
+
+    def _plan_filters(self, filters: dict = None):
+        """Resolve filters once into (where-clause, ids of matching non-duplicate jobs), or None.
+
+        The where-clause restricts the vector query; the ids are computed
+        from the in-memory catalog and restrict the BM25 ranking.
+        """
+        clauses = [{"is_duplicate": False}]
+        allowed = self.catalog.job_ids() - self.duplicate_ids
+        for field, value in (filters or {}).items():
+            if not value:
+                continue
+            if field == "location":
+                alternatives = self.locations.query_terms(value)
+                if not alternatives:
+                    continue
+                options = [
+                    terms_clause[0] if len(terms_clause) == 1 else {"$and": terms_clause}
+                    for terms_clause in ([{location_key(term): True} for term in terms] for terms in alternatives)
+                ]
+                clauses.append(options[0] if len(options) == 1 else {"$or": options})
+                allowed &= self.locations.job_ids(alternatives)
+            elif field in FILTER_FIELDS:
+                values = self._resolve_field(field, value)
+                if not values:
+                    return None
+                clauses.append({field: values[0]} if len(values) == 1 else {field: {"$in": values}})
+                allowed &= {job["job_id"] for job in self.catalog if job.get(field) in values}
+            else:
+                raise ValueError(f"Unsupported filter field: {field}")
+        return (clauses[0] if len(clauses) == 1 else {"$and": clauses}), allowed
+
+    def retrieve(self, query: str, k: int = 5, filters: dict = None, hybrid: bool = True):
+        """Return up to k distinct postings for the query, restricted to postings matching filters.
+
+        filters maps department, job_type, workplace_type or location to a
+        value; it is pushed down into the vector search as a where-clause.
+        With hybrid=True the dense ranking is fused with a BM25 ranking over
+        title, requirements and responsibilities by reciprocal-rank fusion.
+        """
+        plan = self._plan_filters(filters)
+        if plan is None:
+            return []
+        return self._search(query, self.embedding_model.embed_query(query), k, plan, hybrid)
+
+    def retrieve_many(self, queries, k: int = 5, filters: dict = None, hybrid: bool = True):
+        """Retrieve for several queries at once: one batched embedding request, then concurrent searches."""
+        plan = self._plan_filters(filters)
+        if plan is None or not queries:
+            return [[] for _ in queries]
+        vectors = self.embedding_model.embed_queries(list(queries))
+        with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+            return list(executor.map(
+                lambda pair: self._search(pair[0], pair[1], k, plan, hybrid), zip(queries, vectors)
+            ))
+
+    async def aretrieve(self, query: str, k: int = 5, filters: dict = None, hybrid: bool = True):
+        """Async retrieve(): awaits the query embedding, then searches on a worker thread."""
+        plan = self._plan_filters(filters)
+        if plan is None:
+            return []
+        vector = await self.embedding_model.aembed_query(query)
+        return await asyncio.to_thread(self._search, query, vector, k, plan, hybrid)
+
+    async def aretrieve_many(self, queries, k: int = 5, filters: dict = None, hybrid: bool = True):
+        plan = self._plan_filters(filters)
+        if plan is None or not queries:
+            return [[] for _ in queries]
+        vectors = await self.embedding_model.aembed_queries(list(queries))
+        return list(await asyncio.gather(*(
+            asyncio.to_thread(self._search, query, vector, k, plan, hybrid)
+            for query, vector in zip(queries, vectors)
+        )))
+
+    def _search(self, query, vector, k, plan, hybrid):
+        where, allowed = plan
+        dense = [
+            doc for doc, _ in self.db.similarity_search_by_vector_with_relevance_scores(
+                vector, k=k*2, filter=where
+            )
+        ]
+        if hybrid:
+            sparse = [job_id for job_id, _ in self.bm25.search(query, k=k*2, allowed_ids=allowed)]
+            candidates = self._fuse(dense, sparse)
+        else:
+            candidates = dense
+        if not candidates:
+            return []
+        signatures = np.stack([
+            decode_signature(doc.metadata["signature"]) for doc in candidates
+        ])
+        selected = select_distinct(signatures, k, QUERY_DUPLICATE_THRESHOLD)
+        return [candidates[i] for i in selected]
+
+    def _fuse(self, dense, sparse):
+        """Merge dense documents and sparse job_ids into one RRF-ordered list of documents."""
+        docs = {doc.metadata["job_id"]: doc for doc in dense}
+        order = reciprocal_rank_fusion([[doc.metadata["job_id"] for doc in dense], sparse], k=RRF_K)
+        missing = [job_id for job_id in order if job_id not in docs]
+        if missing:
+            fetched = self.db.get(ids=missing, include=["documents", "metadatas"])
+            for job_id, content, metadata in zip(fetched["ids"], fetched["documents"], fetched["metadatas"]):
+                docs[job_id] = Document(page_content=content, metadata=metadata)
+        return [docs[job_id] for job_id in order if job_id in docs]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Maintain the job vector index.")
+    parser.add_argument("--json-path", default="data/jobs.json")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--sync", action="store_true", help="embed only new or changed postings")
+    mode.add_argument("--rebuild", action="store_true", help="rebuild the whole index")
+    args = parser.parse_args()
+
+    JobRetriever(json_path=args.json_path, rebuild_db=args.rebuild, sync_db=args.sync)
@@ -0,0 +1,90 @@
+import numpy as np
+import zlib
+
+NUM_PERMUTATIONS = 128
+LSH_BANDS = 32
+_HASH_PRIME = np.uint64(4294967311)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, 2**32 - 1, size=NUM_PERMUTATIONS, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 2**32 - 1, size=NUM_PERMUTATIONS, dtype=np.uint64)
+
+
+def tokenize(text: str) -> set:
+    return set(text.lower().split())
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """Compute a MinHash signature over the lowercase word set of a document."""
+    tokens = tokenize(text)
+    if not tokens:
+        return np.full(NUM_PERMUTATIONS, _MAX_HASH, dtype=np.uint32)
+    hashes = np.fromiter(
+        (zlib.crc32(token.encode("utf-8")) for token in tokens),
+        dtype=np.uint64,
+        count=len(tokens)
+    )
+    permuted = (np.outer(hashes, _PERM_A) + _PERM_B) % _HASH_PRIME & _MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def encode_signature(signature: np.ndarray) -> str:
+    """Encode a signature as a hex string so it can be stored as vector metadata."""
+    return signature.astype(np.uint32).tobytes().hex()
+
+
+def decode_signature(encoded: str) -> np.ndarray:
+    return np.frombuffer(bytes.fromhex(encoded), dtype=np.uint32)
+
+
+def similarity_matrix(signatures: np.ndarray) -> np.ndarray:
+    """Estimated Jaccard similarity between every pair of signatures."""
+    return (signatures[:, None, :] == signatures[None, :, :]).mean(axis=2)
+
+
+def select_distinct(signatures: np.ndarray, k: int, threshold: float) -> list:
+    """Greedily pick up to k indices, in order, that are not near-duplicates of earlier picks."""
+    if len(signatures) == 0:
+        return []
+    similarities = similarity_matrix(signatures)
+    selected = []
+    for i in range(len(signatures)):
+        if not selected or similarities[i, selected].max() <= threshold:
+            selected.append(i)
+            if len(selected) >= k:
+                break
+    return selected
+
+
+def find_near_duplicates(signatures: np.ndarray, keys: list, threshold: float) -> dict:
+    """Map each near-duplicate index to the earlier index it duplicates.
+
+    Candidate pairs come from LSH banding so the work stays close to linear in
+    the number of documents; only pairs sharing a band and the same key
+    (e.g. normalized title) are compared.
+    """
+    duplicates = {}
+    if len(signatures) < 2:
+        return duplicates
+
+    rows = NUM_PERMUTATIONS // LSH_BANDS
+    buckets = {}
+    for i, signature in enumerate(signatures):
+        for band in range(LSH_BANDS):
+            bucket_key = (band, keys[i], signature[band * rows:(band + 1) * rows].tobytes())
+            buckets.setdefault(bucket_key, []).append(i)
+
+    for members in buckets.values():
+        if len(members) < 2:
+            continue
+        for position, i in enumerate(members[1:], 1):
+            if i in duplicates:
+                continue
+            earlier = np.array(members[:position])
+            scores = (signatures[earlier] == signatures[i]).mean(axis=1)
+            best = int(np.argmax(scores))
+            if scores[best] >= threshold:
+                original = int(earlier[best])
+                duplicates[i] = duplicates.get(original, original)
+    return duplicates
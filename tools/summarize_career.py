@@ -1,13 +1,6 @@
-import google.generativeai as genai
-import os
+from tools.llm_gateway import gateway
 
-def summarize_career(job_info: str, query: str):
-    """Summarize career path and growth opportunities for a job using Gemini API."""
-    
-    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-    
-    model = genai.GenerativeModel('gemini-2.0-flash')
-    
+def career_prompt(job_info: str, query: str) -> str:
     prompt = f"""You are a career advisor. Based on the job information provided, 
 summarize the career path and growth opportunities. Address the user's specific query: {query}
 
@@ -22,9 +15,18 @@ Provide information about:
 - Long-term career outlook
 
 Keep the response focused and actionable."""
-    
+    return prompt
+
+def summarize_career(job_info: str, query: str):
+    """Summarize career path and growth opportunities for a job using Gemini API."""
+    try:
+        return gateway.generate(career_prompt(job_info, query))
+    except Exception as e:
+        return f"Error summarizing career information: {str(e)}"
+
+async def asummarize_career(job_info: str, query: str):
+    """Async summarize_career()."""
     try:
-        response = model.generate_content(prompt)
-        return response.text
+        return await gateway.agenerate(career_prompt(job_info, query))
     except Exception as e:
         return f"Error summarizing career information: {str(e)}"
\ No newline at end of file